@@ -0,0 +1,31 @@
+"""
+Metric instruments for the scrape, parse and delivery hot paths.
+
+Instruments are created through the OpenTelemetry API at import, so they are
+no-ops until otel_config.init_metrics() installs a meter provider.
+Durations are recorded in milliseconds.
+"""
+
+from opentelemetry import metrics
+
+meter = metrics.get_meter("situation-room")
+
+http_fetch_duration = meter.create_histogram(
+    "scraper.http.fetch.duration", unit="ms", description="Time to download a page from nhl.com")
+html_parse_duration = meter.create_histogram(
+    "scraper.html.parse.duration", unit="ms", description="Time to parse a downloaded page")
+notification_send_duration = meter.create_histogram(
+    "notifier.send.duration", unit="ms", description="Time to deliver one notification, retries included")
+
+posts_found = meter.create_counter(
+    "scraper.posts.found", description="Posts seen on the listing page")
+new_posts = meter.create_counter(
+    "scraper.posts.new", description="New posts scraped")
+articles = meter.create_counter(
+    "scraper.articles", description="Article bodies filled, by whether they came from the cache")
+errors = meter.create_counter(
+    "situation_room.errors", description="Errors that were handled without stopping the run, by stage")
+notifications = meter.create_counter(
+    "notifier.notifications", description="Notification deliveries, by team and outcome")
+api_calls_saved = meter.create_counter(
+    "notifier.api_calls_saved", description="Pushover messages saved by coalescing notifications into digests, by team")
@@ -0,0 +1,117 @@
+"""
+On-disk cache of extracted article text, keyed by post URL.
+
+Post._fill() checks this before downloading an article, so a stale or reset
+storage/last_update.json does not cause every article on the listing to be
+fetched again. Entries are evicted once they are older than the max age or
+when the table grows past the max entry count (least recently used first).
+
+The cache lives in storage/, next to the post store. storage/mounted is a
+read-only secret volume in the deployment and cannot hold it, so the
+deployment points ARTICLE_CACHE_PATH at an emptyDir volume, which survives
+container restarts but not the pod being rescheduled. Any SQLite
+error is treated as a cache miss, and the scraper never fails because of
+the cache. The first failed write is logged as an error naming the cache
+path, since an unwritable path fails every put, and later ones as warnings
+with a running count.
+
+Configuration via environment variables:
+- ARTICLE_CACHE_ENABLED: Enable/disable the cache (default: true)
+- ARTICLE_CACHE_PATH: SQLite database file (default: storage/article_cache.sqlite3)
+- ARTICLE_CACHE_MAX_ENTRIES: Maximum number of cached articles (default: 5000)
+- ARTICLE_CACHE_MAX_AGE_DAYS: Maximum age of a cached article in days (default: 30)
+"""
+
+import contextlib
+import os
+import sqlite3
+import time
+
+enabled = os.getenv("ARTICLE_CACHE_ENABLED", "true").lower() == "true"
+cache_path = os.getenv("ARTICLE_CACHE_PATH", "storage/article_cache.sqlite3")
+max_entries = int(os.getenv("ARTICLE_CACHE_MAX_ENTRIES", "5000"))
+max_age_seconds = float(os.getenv("ARTICLE_CACHE_MAX_AGE_DAYS", "30")) * 86400
+
+# Writes that failed since startup, the first one is logged with the cache path
+write_failures = 0
+
+schema = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    post_text TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+def connect():
+    conn = sqlite3.connect(cache_path, timeout=10)
+    conn.execute(schema)
+    return conn
+
+
+def get(url):
+    """
+    Look up the cached article text for a post URL.
+
+    Args:
+        url: Post URL as found on the listing page
+
+    Returns:
+        The cached post text, or None on a miss
+    """
+    if not enabled:
+        return None
+
+    now = time.time()
+    try:
+        with contextlib.closing(connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT post_text FROM articles WHERE url = ? AND fetched_at >= ?",
+                (url, now - max_age_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE articles SET last_used_at = ?, hits = hits + 1 WHERE url = ?", (now, url))
+            return row[0]
+    except sqlite3.Error as e:
+        print(f"[CACHE] Warning: article cache lookup failed: {e}")
+        return None
+
+
+def put(url, post_text):
+    """
+    Store the extracted text of an article and evict old entries.
+
+    Args:
+        url: Post URL as found on the listing page
+        post_text: Extracted article body
+    """
+    global write_failures
+    if not enabled:
+        return
+
+    now = time.time()
+    try:
+        with contextlib.closing(connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO articles (url, post_text, fetched_at, last_used_at, hits) VALUES (?, ?, ?, ?, 0)",
+                (url, post_text, now, now),
+            )
+            evict(conn, now)
+    except sqlite3.Error as e:
+        write_failures += 1
+        if write_failures == 1:
+            print(f"[CACHE] Error: cannot write the article cache at {cache_path}, articles will be refetched: {e}")
+        else:
+            print(f"[CACHE] Warning: article cache write failed ({write_failures} failures so far): {e}")
+
+
+def evict(conn, now):
+    conn.execute("DELETE FROM articles WHERE fetched_at < ?", (now - max_age_seconds,))
+    conn.execute(
+        "DELETE FROM articles WHERE url NOT IN (SELECT url FROM articles ORDER BY last_used_at DESC LIMIT ?)",
+        (max_entries,),
+    )
@@ -0,0 +1,188 @@
+"""
+Backfill the post store from the older pages of the situation room listing.
+
+Walks the listing one page at a time from BACKFILL_START_PAGE, fetches the
+articles of each page with bounded concurrency through Post.dumps(), and
+stores each run of missing posts in one transaction right below the post
+that precedes it on the listing (post_store.insert_below()), so history
+stays in publication order whether the gap is at the top, in the middle
+or past the oldest stored post. Every request, pages and articles alike,
+waits for a shared politeness rate limit.
+
+Progress is checkpointed after every page whose posts were all stored, so
+a killed or failed backfill resumes at the first page it had not finished.
+Posts already in the store are skipped without being fetched, so
+re-running over covered pages is cheap. Start from page 1 (the default) so
+the first missing posts have a stored post to be placed below.
+
+Backfilled posts are never notified. Run it with the scraper stopped or
+between cycles, seeding history or recovering after a long outage.
+
+Usage:
+    python backfill.py [--pages 50] [--workers 4] [--rate 2] [--stop-at-known] [--restart]
+
+Configuration via environment variables:
+- BACKFILL_PAGE_URL: Listing page URL with a {page} placeholder (default: https://www.nhl.com/news/topic/situation-room/?page={page})
+- BACKFILL_START_PAGE: First page to fetch (default: 1)
+- BACKFILL_CHECKPOINT_PATH: Progress file (default: storage/backfill_state.json)
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import get_posts
+import helpers
+import post_store
+
+page_url = os.getenv("BACKFILL_PAGE_URL", f"{get_posts.base_url}{get_posts.listing_path}?page={{page}}")
+start_page = int(os.getenv("BACKFILL_START_PAGE", "1"))
+checkpoint_path = os.getenv("BACKFILL_CHECKPOINT_PATH", "storage/backfill_state.json")
+
+tracer = get_posts.tracer
+
+
+class RateLimit:
+    """Spaces the start of requests at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        time.sleep(start - now)
+
+
+def read_checkpoint():
+    if not os.path.exists(checkpoint_path):
+        return {"next_page": start_page}
+    with open(checkpoint_path, "r") as f:
+        return json.load(f)
+
+
+def write_checkpoint(checkpoint):
+    helpers.write_json_to_disk(checkpoint_path, checkpoint, indent=4)
+
+
+def fetch_page(page, rate_limit):
+    rate_limit.wait()
+    soup = get_posts.soupify(page_url.format(page=page), get_posts.listing_target)
+    return get_posts.listing_cards(soup)
+
+
+def dump_post(title, url, rate_limit):
+    rate_limit.wait()
+    return get_posts.dump_post(title, url)
+
+
+def backfill_page(executor, cards, anchor, rate_limit, span):
+    """
+    Fetch the posts of one page that are not stored yet and store each run of them right below the post before it.
+
+    Args:
+        cards: (title, url) of the page's posts, newest first
+        anchor: URL of the stored post right before the page in listing order, None at the top of the listing
+
+    Returns:
+        Tuple of (posts added, failures, anchor for the next page)
+    """
+    stored = post_store.known(url for _, url in cards)
+    futures = {
+        url: executor.submit(contextvars.copy_context().run, dump_post, title, url, rate_limit)
+        for title, url in cards
+        if url not in stored
+    }
+
+    added = 0
+    failures = 0
+    run = []
+
+    # A post that failed is simply missing from its run, retrying the page later inserts it below the post before it
+    for _, url in cards:
+        if url in stored:
+            if run:
+                added += post_store.insert_below(anchor, run)
+                run = []
+            anchor = url
+            continue
+
+        try:
+            run.append(futures[url].result())
+        except Exception as e:
+            print(f"Failed to backfill {url}: {e}")
+            span.add_event("post.processing_error", {"error": str(e), "url": url})
+            failures += 1
+
+    if run:
+        added += post_store.insert_below(anchor, run)
+        anchor = run[-1]["url"]
+    return added, failures, anchor
+
+
+def run(max_pages, workers, rate, stop_at_known=False, restart=False):
+    with tracer.start_as_current_span("backfill.run") as span:
+        checkpoint = {"next_page": start_page} if restart else read_checkpoint()
+        if checkpoint.get("finished"):
+            print(f"Backfill already finished at page {checkpoint['next_page'] - 1}, use --restart to walk again.")
+            return
+
+        rate_limit = RateLimit(rate)
+        pages = articles = failures = 0
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while pages < max_pages:
+                page = checkpoint["next_page"]
+                cards = fetch_page(page, rate_limit)
+                pages += 1
+                if len(cards) == 0:
+                    print(f"Page {page} has no posts, reached the end of the listing.")
+                    checkpoint["finished"] = True
+                    write_checkpoint(checkpoint)
+                    break
+
+                added, page_failures, anchor = backfill_page(executor, cards, checkpoint.get("anchor"), rate_limit, span)
+                articles += added
+                failures += page_failures
+                print(f"Page {page}: {len(cards)} posts, {added} added, {page_failures} failed")
+
+                # A page only counts as done once every post on it is stored, so the next run retries the failures
+                if page_failures > 0:
+                    print(f"Stopping at page {page}, run again to retry its failed posts.")
+                    break
+
+                checkpoint["next_page"] = page + 1
+                checkpoint["anchor"] = anchor
+                write_checkpoint(checkpoint)
+
+                if stop_at_known and added == 0:
+                    print(f"Every post on page {page} is already stored, stopping.")
+                    break
+
+        elapsed = time.perf_counter() - started
+        span.set_attribute("backfill.pages", pages)
+        span.set_attribute("backfill.articles", articles)
+        span.set_attribute("backfill.failures", failures)
+        print(f"Backfilled {articles} articles from {pages} pages in {elapsed:.1f}s "
+              f"({pages / elapsed:.2f} pages/s, {articles / elapsed:.2f} articles/s), {failures} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50, help="Maximum number of listing pages to walk this run")
+    parser.add_argument("--workers", type=int, default=get_posts.max_per_host, help="Articles fetched concurrently")
+    parser.add_argument("--rate", type=float, default=2.0, help="Maximum requests per second to nhl.com, 0 for no limit")
+    parser.add_argument("--stop-at-known", action="store_true", help="Stop at the first page whose posts are all stored")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from BACKFILL_START_PAGE")
+    args = parser.parse_args()
+
+    run(args.pages, args.workers, args.rate, args.stop_at_known, args.restart)
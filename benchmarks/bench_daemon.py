@@ -0,0 +1,90 @@
+"""
+Compare scrape cycle latency and CPU between the old shell loop, which spawns
+`python get_posts.py` every cycle, and the resident scraper, which calls
+get_posts.run() in-process.
+
+Cycles run back to back against the live site from a scratch storage
+directory, so the real storage/ is never touched.
+
+Usage:
+    python benchmarks/bench_daemon.py [--cycles 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def bench_spawn(cycles, workdir):
+    wall, cpu = [], []
+    for _ in range(cycles):
+        cpu_start, started = children_cpu(), time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(repo_root, "get_posts.py")],
+                       cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        wall.append(time.perf_counter() - started)
+        cpu.append(children_cpu() - cpu_start)
+    return wall, cpu
+
+
+def bench_resident(cycles, workdir):
+    os.chdir(workdir)
+    sys.path.insert(0, repo_root)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import get_posts
+    startup = time.perf_counter() - started
+
+    wall, cpu = [], []
+    for _ in range(cycles):
+        cpu_start, started = time.process_time(), time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            get_posts.run()
+        wall.append(time.perf_counter() - started)
+        cpu.append(time.process_time() - cpu_start)
+    return startup, wall, cpu
+
+
+def summarize(name, wall, cpu):
+    print(f"{name:<10} wall mean={statistics.mean(wall):.3f}s median={statistics.median(wall):.3f}s "
+          f"max={max(wall):.3f}s | cpu mean={statistics.mean(cpu):.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="situation-room-bench-")
+    os.makedirs(os.path.join(workdir, "storage", "mounted"))
+    shutil.copy(os.path.join(repo_root, "storage", "last_update.json"), os.path.join(workdir, "storage"))
+
+    try:
+        spawn_wall, spawn_cpu = bench_spawn(args.cycles, workdir)
+        startup, resident_wall, resident_cpu = bench_resident(args.cycles, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.cycles} cycles each")
+    summarize("spawn", spawn_wall, spawn_cpu)
+    summarize("resident", resident_wall, resident_cpu)
+    print(f"resident one-off startup: {startup:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
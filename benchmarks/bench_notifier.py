@@ -0,0 +1,107 @@
+"""
+Micro-benchmark of notification planning: notifier.plan() against the
+per-post update_message() chain and double group lookup the notifier used
+to have (reproduced below).
+
+Posts are synthetic and every team, including the defunct ARI alias, has a
+made-up group key. Nothing is written to the outbox or sent. The delivery
+counts show how many duplicate sends the plan drops when both teams of a
+post share a group.
+
+Usage:
+    python benchmarks/bench_notifier.py [--posts 5000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+import fixtures  # noqa: E402
+import helpers  # noqa: E402
+import notifier  # noqa: E402
+import post_fields  # noqa: E402
+
+
+def legacy_update_message(post, key, title, _message):
+    if post[key] is not None:
+        _message += f"<b>{title}</b>: {post[key]}\n"
+    return _message
+
+
+def legacy_plan(posts, groups, last_update):
+    planned = []
+    for post in posts:
+        if post["url"] == last_update:
+            break
+
+        home = post["home"]
+        away = post["away"]
+        notification_groups = [groups[helpers.group_to_team[home]], groups[helpers.group_to_team[away]]]
+
+        title = f"{home} vs {away}: {post['type']}"
+        message = legacy_update_message(post, "short_description", "Desc", "")
+        message = legacy_update_message(post, "challenge_initiator", "Initiated By", message)
+        message = legacy_update_message(post, "type_of_challenge", "Challenge Type", message)
+        message = legacy_update_message(post, "result", "Result", message)
+        message = legacy_update_message(post, "explanation", "Explanation", message)
+        message = legacy_update_message(post, "penalty", "Penalty", message)
+
+        for group in notification_groups:
+            planned.append((post["url"], group, title, message))
+    return planned
+
+
+def synthesize_posts(count, rng):
+    posts = []
+    for index in range(count):
+        text, url, fields = fixtures.synthesize_post(index, rng)
+        # Some posts still use the abbreviation of the relocated Arizona franchise
+        if index % 50 == 0:
+            text = text.replace(text.split(": ")[1].split(" @ ")[0], "ARI", 1)
+
+        title = post_fields.parse_title(post_fields.transfigure(text))
+        body = post_fields.parse_body(post_fields.transfigure("\n".join(fields)), title.type)
+        posts.append({
+            "type": title.type,
+            "home": title.home,
+            "away": title.away,
+            "short_description": title.short_description,
+            "url": url,
+            "challenge_initiator": body.challenge_initiator,
+            "type_of_challenge": body.type_of_challenge,
+            "result": body.result,
+            "explanation": body.explanation,
+            "penalty": body.penalty,
+        })
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    posts = synthesize_posts(args.posts, random.Random(0))
+    groups = {name: f"group-{name.lower().replace(' ', '-')}" for name in set(helpers.group_to_team.values())}
+    index = notifier.team_index(groups)
+
+    legacy_deliveries = legacy_plan(posts, groups, None)
+    deliveries = [(n.post_url, group, n.title, n.message) for n in notifier.plan(posts, index, None) for group in n.groups]
+    assert set(deliveries) == set(legacy_deliveries)
+
+    legacy = min(timeit.repeat(lambda: legacy_plan(posts, groups, None), number=1, repeat=args.repeat))
+    current = min(timeit.repeat(lambda: notifier.plan(posts, index, None), number=1, repeat=args.repeat))
+
+    print(f"{args.posts} posts, best of {args.repeat}, {len(legacy_deliveries)} -> {len(deliveries)} deliveries")
+    print(f"update_message chain  {legacy * 1e6 / args.posts:7.2f}us/post  {args.posts / legacy:9.0f} posts/s")
+    print(f"fan-out plan          {current * 1e6 / args.posts:7.2f}us/post  {args.posts / current:9.0f} posts/s ({legacy / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Time and peak memory of each HTML parser backend over a fixture set.
+
+Each backend parses the listing and every article the way the scraper does
+and runs the same lookups on the result. Peak memory comes from tracemalloc,
+so it covers the Python objects bs4 builds but not lxml's internal buffers.
+
+Usage:
+    python benchmarks/bench_parsing.py [--fixtures DIR] [--repeat 5]
+
+Without --fixtures a synthetic set is generated in a temporary directory.
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("OTEL_TRACES_ENABLED", "false")
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+import bs4  # noqa: E402
+
+import fixtures  # noqa: E402
+import get_posts  # noqa: E402
+
+backends = [
+    ("html.parser", "html.parser", False),
+    ("html.parser+strainer", "html.parser", True),
+    ("lxml", "lxml", False),
+    ("lxml+strainer", "lxml", True),
+]
+
+
+def parse_set(pages, parser, strain):
+    listing, articles = pages
+    soup = get_posts.parse_html(listing, get_posts.listing_target if strain else None, parser)
+    assert soup.find_all('div', {'class': 'd3-l-col__col-3'})
+
+    for article in articles:
+        soup = get_posts.parse_html(article, get_posts.article_target if strain else None, parser)
+        assert soup.find('article').find('div', {'class': 'oc-c-body-part oc-c-markdown-stories'}) is not None
+
+
+def bench(pages, parser, strain, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse_set(pages, parser, strain)
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    parse_set(pages, parser, strain)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times, peak
+
+
+def load(directory):
+    with open(os.path.join(directory, "listing.html"), "rb") as f:
+        listing = f.read()
+    articles = []
+    for path in sorted(glob.glob(os.path.join(directory, "articles", "*.html"))):
+        with open(path, "rb") as f:
+            articles.append(f.read())
+    return listing, articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="fixture set directory")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = args.fixtures
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="situation-room-fixtures-")
+        fixtures.synthesize(directory, 12)
+
+    try:
+        pages = load(directory)
+    finally:
+        if args.fixtures is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    size = len(pages[0]) + sum(len(article) for article in pages[1])
+    print(f"listing + {len(pages[1])} articles, {size / 1024:.0f} KiB, best of {args.repeat}")
+
+    for name, builder, strain in backends:
+        if bs4.builder_registry.lookup(builder) is None:
+            print(f"{name:<22} skipped, not installed")
+            continue
+        times, peak = bench(pages, builder, strain, args.repeat)
+        print(f"{name:<22} best={min(times) * 1000:8.1f}ms median={statistics.median(times) * 1000:8.1f}ms "
+              f"peak={peak / 1024 / 1024:6.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark of post field extraction: the single-pass post_fields module
+against the split()-based getters Post used to have (reproduced below).
+
+Inputs are synthetic titles and article bodies, and both implementations are
+checked to produce identical fields before timing.
+
+Usage:
+    python benchmarks/bench_post_fields.py [--posts 1000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+import fixtures  # noqa: E402
+import post_fields  # noqa: E402
+
+
+def legacy_transfigure(text):
+    return (text
+            .replace("\u2013", "-")
+            .replace("\u2019", "'")
+            .replace("\u00a0", " ")
+            .replace("\u201c", '"')
+            .replace("\u201c", '"')
+            .replace("\u201d", '"')
+            .strip())
+
+
+class LegacyPost:
+    def __init__(self, text, post_text):
+        self.text = legacy_transfigure(text)
+        self.post_text = legacy_transfigure(post_text)
+
+    def get_type(self):
+        return legacy_transfigure(self.text.split(": ")[0])
+
+    def get_home(self):
+        return legacy_transfigure(self.text.split(": ")[1].split(" @ ")[0])
+
+    def get_away(self):
+        return legacy_transfigure(self.text.split(": ")[1].split(" @ ")[1].split("-")[0])
+
+    def get_short_description(self):
+        if self.get_type() == "Officials Update":
+            return None
+        return legacy_transfigure(self.text.split("-")[1])
+
+    def get_label(self, label):
+        if f"{label}: " not in self.post_text:
+            return None
+        return legacy_transfigure(self.post_text.split(f"{label}: ")[1].split("\n")[0])
+
+    def get_result(self):
+        if self.get_type() == "Officials Update":
+            return legacy_transfigure(self.post_text)
+        return self.get_label("Result")
+
+    def dumps(self):
+        return {
+            "type": self.get_type(),
+            "home": self.get_home(),
+            "away": self.get_away(),
+            "short_description": self.get_short_description(),
+            "challenge_initiator": self.get_label("Challenge Initiated By"),
+            "type_of_challenge": self.get_label("Type of Challenge"),
+            "result": self.get_result(),
+            "explanation": self.get_label("Explanation"),
+            "penalty": self.get_label("Penalty"),
+        }
+
+
+def current_dumps(text, post_text):
+    title = post_fields.parse_title(post_fields.transfigure(text))
+    body = post_fields.parse_body(post_fields.transfigure(post_text), title.type)
+    return {
+        "type": title.type,
+        "home": title.home,
+        "away": title.away,
+        "short_description": title.short_description,
+        "challenge_initiator": body.challenge_initiator,
+        "type_of_challenge": body.type_of_challenge,
+        "result": body.result,
+        "explanation": body.explanation,
+        "penalty": body.penalty,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    inputs = []
+    for index in range(args.posts):
+        title, _, fields = fixtures.synthesize_post(index, rng)
+        inputs.append((title, "\n".join(fields)))
+
+    for text, post_text in inputs:
+        assert LegacyPost(text, post_text).dumps() == current_dumps(text, post_text), text
+
+    legacy = min(timeit.repeat(lambda: [LegacyPost(t, p).dumps() for t, p in inputs], number=1, repeat=args.repeat))
+    current = min(timeit.repeat(lambda: [current_dumps(t, p) for t, p in inputs], number=1, repeat=args.repeat))
+
+    print(f"{args.posts} posts, best of {args.repeat}")
+    print(f"split getters  {legacy * 1e6 / args.posts:7.2f}us/post")
+    print(f"single pass    {current * 1e6 / args.posts:7.2f}us/post ({legacy / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
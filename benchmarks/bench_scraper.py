@@ -0,0 +1,144 @@
+"""
+Offline benchmark of a full scrape cycle, per stage, over fixture sets.
+
+get_posts.get_posts() runs against replayed pages (see replay.py) and the
+stages are timed by wrapping the functions that implement them:
+
+- fetch: get_posts.fetch (serving the replayed response)
+- parse: get_posts.parse_html
+- extract: post_fields.parse_title / parse_body
+- serialize: post_store.append into a scratch store
+
+Stage times are summed over the fetch worker threads, so together they can
+exceed the wall time of the cycle. Peak memory is measured with tracemalloc
+on a separate run.
+
+Usage:
+    python benchmarks/bench_scraper.py [--fixtures DIR ...] [--repeat 3]
+
+Without --fixtures, synthetic small (3 posts), typical (12) and busy playoff
+night (40) sets are generated.
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import fixtures
+import replay
+
+import get_posts
+import post_fields
+import post_store
+
+synthetic_sets = {"small": 3, "typical": 12, "busy": 40}
+
+stage_functions = [
+    ("fetch", get_posts, "fetch"),
+    ("parse", get_posts, "parse_html"),
+    ("extract", post_fields, "parse_title"),
+    ("extract", post_fields, "parse_body"),
+    ("serialize", post_store, "append"),
+]
+
+timings = collections.defaultdict(float)
+timings_lock = threading.Lock()
+
+
+def timed(stage, function):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with timings_lock:
+                timings[stage] += elapsed
+    return wrapper
+
+
+@contextlib.contextmanager
+def stage_timers():
+    originals = [(module, name, getattr(module, name)) for _, module, name in stage_functions]
+    for stage, module, name in stage_functions:
+        setattr(module, name, timed(stage, getattr(module, name)))
+    try:
+        yield
+    finally:
+        for module, name, function in originals:
+            setattr(module, name, function)
+
+
+def cycle():
+    """One cold scrape cycle in fresh storage, returns the number of posts scraped."""
+    with replay.scratch_storage(), contextlib.redirect_stdout(io.StringIO()):
+        post_store.store_path = "storage/posts.sqlite3"
+        posts = get_posts.get_posts()
+        post_store.append(posts)
+    return len(posts)
+
+
+def bench(directory, repeat):
+    replay.install(directory)
+
+    walls, stages = [], collections.defaultdict(list)
+    with stage_timers():
+        for _ in range(repeat):
+            timings.clear()
+            started = time.perf_counter()
+            count = cycle()
+            walls.append(time.perf_counter() - started)
+            for stage in ("fetch", "parse", "extract", "serialize"):
+                stages[stage].append(timings[stage])
+
+    tracemalloc.start()
+    cycle()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return count, walls, stages, peak
+
+
+def report(name, count, walls, stages, peak):
+    per_stage = " ".join(f"{stage}={statistics.median(values) * 1000:7.1f}ms" for stage, values in stages.items())
+    print(f"{name:<10} posts={count:<3} wall={statistics.median(walls) * 1000:7.1f}ms {per_stage} "
+          f"peak={peak / 1024 / 1024:5.1f}MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", nargs="*", help="fixture set directories")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    store_path = post_store.store_path
+    generated = None
+    if args.fixtures:
+        sets = {os.path.basename(os.path.normpath(directory)): directory for directory in args.fixtures}
+    else:
+        generated = tempfile.mkdtemp(prefix="situation-room-fixtures-")
+        sets = {}
+        for name, post_count in synthetic_sets.items():
+            sets[name] = os.path.join(generated, name)
+            fixtures.synthesize(sets[name], post_count)
+
+    try:
+        print(f"median of {args.repeat} cold cycles")
+        for name, directory in sets.items():
+            report(name, *bench(directory, args.repeat))
+    finally:
+        post_store.store_path = store_path
+        if generated is not None:
+            shutil.rmtree(generated, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
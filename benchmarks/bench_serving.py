@@ -0,0 +1,54 @@
+"""
+Latency percentiles and throughput of a running website at increasing
+concurrency.
+
+Start the site first, e.g. `gunicorn -c gunicorn.conf.py website:app` or
+`python -m flask --app website run` to compare with the development server.
+
+Usage:
+    python benchmarks/bench_serving.py [--url http://127.0.0.1:5000/] [--concurrency 1,4,16,64] [--requests 500]
+"""
+
+import argparse
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def timed_get(url):
+    started = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_level(url, concurrency, requests):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(lambda _: timed_get(url), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    print(f"c={concurrency:<4} {requests / elapsed:8.0f} req/s  p50={percentile(latencies, 0.5) * 1000:7.1f}ms "
+          f"p90={percentile(latencies, 0.9) * 1000:7.1f}ms p99={percentile(latencies, 0.99) * 1000:7.1f}ms "
+          f"mean={statistics.mean(latencies) * 1000:7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000/")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=500, help="requests per level")
+    args = parser.parse_args()
+
+    timed_get(args.url)
+    for concurrency in [int(level) for level in args.concurrency.split(",")]:
+        run_level(args.url, concurrency, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Startup cost of each entry point, with telemetry (tracing and metrics) enabled and disabled.
+
+Each entry point's startup (imports plus telemetry initialization) runs in a
+fresh interpreter under `python -X importtime`. Reported are the wall time of
+that interpreter and the cumulative import time of the OpenTelemetry, gRPC
+and protobuf packages taken from the importtime output.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+entry_points = {
+    "get_posts": "import get_posts",
+    "notifier": "import notifier, otel_config; otel_config.init_telemetry('situation-room-notifier'); otel_config.instrument_requests()",
+    "website": "import website",
+}
+
+telemetry_packages = ("opentelemetry", "grpc", "google.protobuf")
+
+
+def telemetry_import_us(importtime_output):
+    total = 0
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, package = line.split("|")
+        # Only top-level imports, nested ones are already part of their parent's cumulative time
+        if package.startswith("  ") or not package.strip().startswith(telemetry_packages):
+            continue
+        if cumulative.strip().isdigit():
+            total += int(cumulative)
+    return total
+
+
+def run(snippet, tracing, workdir):
+    # Metrics follow tracing so the disabled runs never load the SDK
+    enabled = "true" if tracing else "false"
+    env = dict(os.environ, OTEL_TRACES_ENABLED=enabled, OTEL_METRICS_ENABLED=enabled, PYTHONPATH=repo_root)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", snippet],
+                            cwd=workdir, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.splitlines()[-1])
+    return elapsed, telemetry_import_us(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="situation-room-bench-")
+    for name, snippet in entry_points.items():
+        for tracing in (True, False):
+            runs = [run(snippet, tracing, workdir) for _ in range(args.runs)]
+            wall = statistics.median(elapsed for elapsed, _ in runs)
+            telemetry = statistics.median(us for _, us in runs)
+            print(f"{name:<10} tracing={'on ' if tracing else 'off'} wall={wall * 1000:7.1f}ms "
+                  f"telemetry imports={telemetry / 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Requests per second for each website endpoint, driven in-process through
+Flask's WSGI test client so only the application code is measured.
+
+Run it on two checkouts to compare before and after a change. Requests to
+/subscribe-final select no teams, so nothing is sent to Pushover but the
+groups lookup still runs.
+
+Usage:
+    python benchmarks/bench_website.py [--seconds 2]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OTEL_TRACES_ENABLED", "false")
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+
+def measure(client, seconds, method, path, **kwargs):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        response = getattr(client, method)(path, **kwargs)
+        assert response.status_code < 400, (path, response.status_code)
+        count += 1
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each endpoint")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="situation-room-bench-")
+    os.makedirs(os.path.join(workdir, "storage", "mounted"))
+    os.chdir(workdir)
+
+    try:
+        import helpers
+        import website
+
+        with open("storage/mounted/groups.json", "w") as f:
+            f.write(json.dumps({team: f"group-{abbreviation}" for abbreviation, team in helpers.group_to_team.items()}))
+
+        client = website.app.test_client()
+        etag = client.get("/").headers.get("ETag")
+
+        cases = [
+            ("landing", "get", "/", {}),
+            ("landing (If-None-Match)", "get", "/", {"headers": {"If-None-Match": etag or ""}}),
+            ("choose team", "get", "/subscribe-choose-team?pushover_user_key=u1234567890", {}),
+            ("subscribe final", "post", "/subscribe-final?pushover_user_key=u1234567890", {"data": {"email": "fan@example.com"}}),
+        ]
+        for name, method, path, kwargs in cases:
+            print(f"{name:<26} {measure(client, args.seconds, method, path, **kwargs):10.0f} req/s")
+    finally:
+        os.chdir(repo_root)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Fixture page sets for the offline benchmarks.
+
+A fixture set is a directory holding the listing page and one file per
+article, laid out so a page can be looked up from its nhl.com path:
+
+    <set>/listing.html
+    <set>/articles/<article_file(url)>
+
+synthesize() writes a set that mirrors the markup the scraper reads (listing
+cards, article body) wrapped in the kind of navigation and inline script
+padding the real pages carry, so parser cost is representative.
+"""
+
+import json
+import os
+import random
+
+teams = ["ANA", "BOS", "BUF", "CAR", "CBJ", "CGY", "CHI", "COL", "DAL", "DET", "EDM", "FLA", "LAK", "MIN",
+         "MTL", "NJD", "NSH", "NYI", "NYR", "OTT", "PHI", "PIT", "SEA", "SJS", "STL", "TBL", "TOR", "UTA",
+         "VAN", "VGK", "WPG", "WSH"]
+
+challenges = ["Offside", "Goaltender Interference", "Missed Stoppage"]
+periods = ["first", "second", "third", "overtime"]
+
+
+def article_file(url):
+    return url.strip("/").replace("/", "_") + ".html"
+
+
+def page(title, body, rng):
+    nav = "\n".join(f'<li class="nav-item"><a href="/news/topic/{i}/">Topic {i}</a></li>' for i in range(300))
+    state = json.dumps([{"id": i, "slug": f"story-{i}", "teaser": "x" * rng.randint(50, 200)} for i in range(400)])
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<header><nav><ul>{nav}</ul></nav></header>
+<main>{body}</main>
+<footer><ul>{nav}</ul></footer>
+<script>window.__INITIAL_STATE__ = {state};</script>
+</body>
+</html>
+"""
+
+
+def synthesize_post(index, rng):
+    home, away = rng.sample(teams, 2)
+    minute, second = rng.randint(0, 19), rng.randint(0, 59)
+    period = rng.choice(periods)
+
+    if index % 5 == 4:
+        title = f"Officials Update: {home} @ {away} - {minute:02d}:{second:02d} of the {period} period"
+        fields = [f"At {minute:02d}:{second:02d} of the {period} period the officials reviewed the play – the call on the ice stands."]
+    else:
+        challenge = rng.choice(challenges)
+        title = f"Coach’s Challenge: {home} @ {away} - {minute:02d}:{second:02d} of the {period} period"
+        fields = [
+            f"Challenge Initiated By: {rng.choice([home, away])}",
+            f"Type of Challenge: {challenge}",
+            f"Result: Call on the ice is {rng.choice(['confirmed', 'overturned'])} – {rng.choice(['Goal', 'No Goal'])}",
+            f"Explanation: Video review determined the play was {challenge.lower()} “by rule”.",
+        ]
+        if index % 3 == 0:
+            fields.append(f"Penalty: {rng.choice([home, away])} is assessed a minor penalty for delay of game.")
+
+    url = f"/news/situation-room-{home.lower()}-{away.lower()}-{index}"
+    return title, url, fields
+
+
+def synthesize(directory, post_count, seed=0):
+    """
+    Write a synthetic fixture set.
+
+    Args:
+        directory: Directory to write the set into
+        post_count: Number of posts on the listing page
+        seed: Seed for the random generator, sets are deterministic per seed
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(directory, "articles"), exist_ok=True)
+
+    cards = []
+    for index in range(post_count):
+        title, url, fields = synthesize_post(index, rng)
+        cards.append(f'<div class="d3-l-col__col-3"><a href="{url}"><div class="fa-text"><h3>{title}</h3></div></a></div>')
+
+        paragraphs = "\n".join(f"<p>{field}</p>" for field in fields)
+        body = f"""<article><h1>{title}</h1>
+<div class="oc-c-body-part oc-c-markdown-stories">
+{paragraphs}
+</div></article>"""
+        with open(os.path.join(directory, "articles", article_file(url)), "w") as f:
+            f.write(page(title, body, rng))
+
+    listing = f'<div class="d3-l-row">{"".join(cards)}</div>'
+    with open(os.path.join(directory, "listing.html"), "w") as f:
+        f.write(page("Situation Room", listing, rng))
@@ -0,0 +1,138 @@
+"""
+Record/replay of nhl.com pages so the scraper can run fully offline.
+
+`record` saves the live listing and every article on it as a fixture set
+(see fixtures.py for the layout). `install` mounts a transport adapter on
+get_posts.session that answers every nhl.com request from a fixture set, so
+get_posts.get_posts() and Post.dumps() run unchanged without the network.
+
+Usage:
+    python benchmarks/replay.py record DIR
+    python benchmarks/replay.py run DIR
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from urllib.parse import urlparse
+
+os.environ.setdefault("OTEL_TRACES_ENABLED", "false")
+os.environ.setdefault("OTEL_METRICS_ENABLED", "false")
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+import requests  # noqa: E402
+
+import fixtures  # noqa: E402
+import get_posts  # noqa: E402
+
+
+def fixture_path(directory, path):
+    if path == get_posts.listing_path:
+        return os.path.join(directory, "listing.html")
+    return os.path.join(directory, "articles", fixtures.article_file(path))
+
+
+class FixtureAdapter(requests.adapters.BaseAdapter):
+    """Answers requests from a fixture set, 404 for pages that were not recorded."""
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        path = fixture_path(self.directory, urlparse(request.url).path)
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.encoding = "utf-8"
+        if os.path.exists(path):
+            response.status_code = 200
+            response.headers["Content-Type"] = "text/html; charset=utf-8"
+            with open(path, "rb") as f:
+                response.raw = io.BytesIO(f.read())
+        else:
+            response.status_code = 404
+            response.raw = io.BytesIO(b"")
+        return response
+
+    def close(self):
+        pass
+
+
+def install(directory):
+    """Serve every nhl.com request made through get_posts.session from a fixture set."""
+    get_posts.session.mount(get_posts.base_url, FixtureAdapter(directory))
+
+
+@contextlib.contextmanager
+def scratch_storage():
+    """
+    Run in a temporary working directory with fresh storage and no article cache.
+
+    Like a fresh deploy the notifier never updated, so get_posts() seeds the
+    listing: every article on it is fetched and returned, flagged as seeded.
+    """
+    previous = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="situation-room-replay-")
+    os.makedirs(os.path.join(workdir, "storage", "mounted"))
+    with open(os.path.join(workdir, "storage", "last_update.json"), "w") as f:
+        f.write(json.dumps({"last_update": "NEVER_UPDATED"}))
+
+    cache_enabled = get_posts.article_cache.enabled
+    get_posts.article_cache.enabled = False
+    os.chdir(workdir)
+    try:
+        yield workdir
+    finally:
+        os.chdir(previous)
+        get_posts.article_cache.enabled = cache_enabled
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def record(directory):
+    os.makedirs(os.path.join(directory, "articles"), exist_ok=True)
+
+    listing = get_posts.fetch(f"{get_posts.base_url}{get_posts.listing_path}")
+    listing.raise_for_status()
+    with open(fixture_path(directory, get_posts.listing_path), "wb") as f:
+        f.write(listing.content)
+
+    soup = get_posts.parse_html(listing.content, get_posts.listing_target)
+    for card in soup.find_all('div', {'class': 'd3-l-col__col-3'}):
+        path = card.find('a')['href']
+        print(f"Recording {path}")
+        article = get_posts.fetch(f"{get_posts.base_url}{path}")
+        article.raise_for_status()
+        with open(fixture_path(directory, path), "wb") as f:
+            f.write(article.content)
+
+
+def run(directory):
+    install(directory)
+    with scratch_storage(), contextlib.redirect_stdout(sys.stderr):
+        posts = get_posts.get_posts()
+    print(json.dumps(posts, indent=4))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["record", "run"])
+    parser.add_argument("directory")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.directory)
+    else:
+        run(args.directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Record of team group enrollments requested on the website.
+
+/subscribe-final stores one row per selected team and returns right away;
+the add_user calls run on the Pushover send pool. Each row ends up done, or
+pending with its attempt count and last error so it is picked up again, or
+failed once it runs out of attempts.
+
+Configuration via environment variables:
+- ENROLLMENTS_PATH: SQLite database file (default: storage/enrollments.sqlite3)
+- ENROLLMENTS_MAX_ATTEMPTS: Attempts before an enrollment is marked failed (default: 5)
+- ENROLLMENTS_RETRY_AFTER_SECONDS: Age at which a pending enrollment is retried (default: 300)
+"""
+
+import os
+import sqlite3
+import time
+
+enrollments_path = os.getenv("ENROLLMENTS_PATH", "storage/enrollments.sqlite3")
+max_attempts = int(os.getenv("ENROLLMENTS_MAX_ATTEMPTS", "5"))
+retry_after_seconds = float(os.getenv("ENROLLMENTS_RETRY_AFTER_SECONDS", "300"))
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+schema = """
+CREATE TABLE IF NOT EXISTS enrollments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_key TEXT,
+    team TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    memo TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS enrollments_state ON enrollments (state, updated_at);
+"""
+
+
+def connect():
+    conn = sqlite3.connect(enrollments_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(schema)
+    return conn
+
+
+def enqueue(conn, user_key, team, group_key, memo):
+    """
+    Record an enrollment to be made.
+
+    Returns:
+        The new row id
+    """
+    now = time.time()
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO enrollments (user_key, team, group_key, memo, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_key, team, group_key, memo, now, now),
+        )
+    return cursor.lastrowid
+
+
+def get(conn, row_id):
+    return conn.execute("SELECT * FROM enrollments WHERE id = ?", (row_id,)).fetchone()
+
+
+def claim_stale(conn):
+    """
+    Claim the pending enrollments untouched for retry_after_seconds, i.e. not
+    still in flight, so they can be retried.
+
+    The claimed rows are touched in the same transaction, so concurrent callers never claim the same row.
+
+    Returns:
+        Ids of the claimed rows
+    """
+    now = time.time()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            "SELECT id FROM enrollments WHERE state = ? AND updated_at < ? ORDER BY id",
+            (PENDING, now - retry_after_seconds),
+        ).fetchall()
+        row_ids = [row["id"] for row in rows]
+        conn.executemany("UPDATE enrollments SET updated_at = ? WHERE id = ?", [(now, row_id) for row_id in row_ids])
+    return row_ids
+
+
+def mark_done(conn, row_id):
+    with conn:
+        conn.execute(
+            "UPDATE enrollments SET state = ?, attempts = attempts + 1, last_error = NULL, updated_at = ? WHERE id = ?",
+            (DONE, time.time(), row_id),
+        )
+
+
+def mark_failed(conn, row_id, error):
+    """Record a failed attempt, the row stays pending until it runs out of attempts."""
+    with conn:
+        conn.execute(
+            "UPDATE enrollments SET attempts = attempts + 1, last_error = ?, updated_at = ?, "
+            "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE id = ?",
+            (error, time.time(), max_attempts, FAILED, PENDING, row_id),
+        )
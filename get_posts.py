@@ -1,60 +1,102 @@
 import bs4
 import requests
-import json
-from datetime import datetime
-
+import os
+import contextlib
+import contextvars
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import app_metrics
+import article_cache
 import helpers
+import post_fields
+import post_store
+import profiling
+from post_fields import transfigure
 
 # OpenTelemetry imports
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
 import otel_config
 
 # Initialize OpenTelemetry
 tracer = otel_config.init_telemetry("situation-room-scraper", "1.0.0")
 
 # Instrument requests library for automatic HTTP tracing
-# Exclude OTEL collector endpoints to prevent instrumentation loops
-RequestsInstrumentor().instrument(
-    excluded_urls=".*v1/traces.*,.*opentelemetry-collector.*"
-)
+otel_config.instrument_requests()
 
 base_url = "https://www.nhl.com"
+listing_path = "/news/topic/situation-room/"
+
+# Shared session so a resident scraper keeps its TCP/TLS connections to nhl.com alive between cycles
+session = requests.Session()
+request_timeout = float(os.getenv("SCRAPER_REQUEST_TIMEOUT_SECONDS", "30"))
+
+# Article pages are fetched concurrently, but never more than max_per_host at once against a single host
+fetch_workers = int(os.getenv("SCRAPER_FETCH_WORKERS", "8"))
+max_per_host = int(os.getenv("SCRAPER_MAX_PER_HOST", "4"))
+session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max(fetch_workers, max_per_host)))
+
+host_slots = {}
+host_slots_lock = threading.Lock()
+
+# bs4 tree builder, html.parser is used when the configured one is not installed
+html_parser = os.getenv("SCRAPER_HTML_PARSER", "lxml")
+if bs4.builder_registry.lookup(html_parser) is None:
+    print(f"HTML parser {html_parser} is not available, falling back to html.parser")
+    html_parser = "html.parser"
+
+# Only build the subtrees we read instead of the whole page
+parse_only_targets = os.getenv("SCRAPER_PARSE_ONLY_TARGETS", "true").lower() == "true"
+listing_target = bs4.SoupStrainer('div', {'class': 'd3-l-col__col-3'})
+article_target = bs4.SoupStrainer('article')
+
+# Responses are streamed and reading stops once everything we parse has arrived
+stream_responses = os.getenv("SCRAPER_STREAM_RESPONSES", "true").lower() == "true"
+stream_chunk_size = int(os.getenv("SCRAPER_STREAM_CHUNK_BYTES", "16384"))
+listing_card_marker = b"d3-l-col__col-3"
 
 class Post:
     def __init__(self, text, url):
         self.text = transfigure(text)
         self.url = transfigure(url)
+        self.title = post_fields.parse_title(self.text)
 
         self.post_text = None
+        self.body = None
 
     def get_text(self):
-        return transfigure(self.text)
+        return self.text
 
     def get_type(self):
-        return transfigure(self.text.split(": ")[0])
+        return self.title.type
 
     def get_home(self):
-        return transfigure(self.text.split(": ")[1].split(" @ ")[0])
+        return self.title.home
 
     def get_away(self):
-
-        self.text.split(": ")[1].split(" @ ")[1].split("-")[0]
-
-        return transfigure(self.text.split(": ")[1].split(" @ ")[1].split("-")[0])
+        return self.title.away
 
     def get_short_description(self):
-        if self.get_type() == "Officials Update":
-            return None
-
-        return transfigure(self.text.split("-")[1])
+        return self.title.short_description
 
     def get_url(self):
-        return transfigure(self.url)
+        return self.url
 
     def _fill(self):
         with tracer.start_as_current_span("post.fill_details") as span:
             span.set_attribute("post.url", self.url)
-            soup = soupify(f"{base_url}{self.url}")
+
+            cached = article_cache.get(self.url)
+            span.set_attribute("post.cache_hit", cached is not None)
+            app_metrics.articles.add(1, {"cache_hit": cached is not None})
+            if cached is not None:
+                self.post_text = cached
+                span.set_attribute("post.text_length", len(self.post_text))
+                return
+
+            soup = soupify(f"{base_url}{self.url}", article_target, article_end)
             article = soup.find('article')
 
             article_body = article.find('div', {'class': 'oc-c-body-part oc-c-markdown-stories'})
@@ -62,53 +104,29 @@ class Post:
             self.post_text = transfigure(article_body.text)
             span.set_attribute("post.text_length", len(self.post_text))
 
-    def get_challenge_initiator(self):
-        if self.post_text is None:
-            self._fill()
+            article_cache.put(self.url, self.post_text)
 
-        if "Challenge Initiated By: " not in self.post_text:
-            return None
+    def get_body(self):
+        if self.body is None:
+            if self.post_text is None:
+                self._fill()
+            self.body = post_fields.parse_body(self.post_text, self.title.type)
+        return self.body
 
-        return transfigure(self.post_text.split("Challenge Initiated By: ")[1].split("\n")[0])
+    def get_challenge_initiator(self):
+        return self.get_body().challenge_initiator
 
     def get_type_of_challenge(self):
-        if self.post_text is None:
-            self._fill()
-
-        if "Type of Challenge: " not in self.post_text:
-            return None
-
-        return transfigure(self.post_text.split("Type of Challenge: ")[1].split("\n")[0])
+        return self.get_body().type_of_challenge
 
     def get_result(self):
-        if self.post_text is None:
-            self._fill()
-
-        if self.get_type() == "Officials Update":
-            return transfigure(self.post_text)
-
-        if "Result: " not in self.post_text:
-            return None
-
-        return transfigure(self.post_text.split("Result: ")[1].split("\n")[0])
+        return self.get_body().result
 
     def get_explination(self):
-        if self.post_text is None:
-            self._fill()
-
-        if "Explanation: " not in self.post_text:
-            return None
-
-        return transfigure(self.post_text.split("Explanation: ")[1].split("\n")[0])
+        return self.get_body().explanation
 
     def get_penalty(self):
-        if self.post_text is None:
-            self._fill()
-
-        if "Penalty: " not in self.post_text:
-            return None
-
-        return transfigure(self.post_text.split("Penalty: ")[1].split("\n")[0])
+        return self.get_body().penalty
 
     def dumps(self):
         print(f"Dumping {self.url}")
@@ -125,63 +143,240 @@ class Post:
             "penalty": self.get_penalty()
         }
 
-def transfigure(text):
-    return (text
-            .replace("\u2013", "-")
-            .replace("\u2019", "'")
-            .replace("\u00a0", " ")
-            .replace("\u201c", '"')
-            .replace("\u201c", '"')
-            .replace("\u201d", '"')
-            .strip())
-
-def soupify(url):
+def host_slot(url):
+    host = urlparse(url).netloc
+    with host_slots_lock:
+        if host not in host_slots:
+            host_slots[host] = threading.BoundedSemaphore(max_per_host)
+        return host_slots[host]
+
+def fetch(url, headers=None, stream=False):
+    """
+    GET a page, holding its host slot for the whole download.
+
+    A streamed body is read after this returns, so with stream=True the caller
+    must hold host_slot(url) itself until read_body() is done.
+    """
+    with contextlib.nullcontext() if stream else host_slot(url):
+        started = time.perf_counter()
+        r = session.get(url, headers=headers, timeout=request_timeout, stream=stream)
+        app_metrics.http_fetch_duration.record(
+            (time.perf_counter() - started) * 1000,
+            {"http.host": urlparse(url).netloc, "http.status_code": r.status_code},
+        )
+        return r
+
+def parse_html(content, parse_only=None, parser=None):
+    return bs4.BeautifulSoup(content, parser or html_parser, from_encoding="utf-8", parse_only=parse_only)
+
+def article_end(body, searched):
+    end = body.find(b"</article>", max(0, searched - len(b"</article>")))
+    return -1 if end < 0 else end + len(b"</article>")
+
+def listing_end(cursor):
+    """Stop function ending the listing right before the card that follows the cursor's card."""
+    if not cursor:
+        return None
+
+    cursor_marker = f'href="{cursor}"'.encode("utf-8")
+    cursor_at = -1
+
+    def end(body, searched):
+        nonlocal cursor_at
+        if cursor_at < 0:
+            cursor_at = body.find(cursor_marker, max(0, searched - len(cursor_marker)))
+            if cursor_at < 0:
+                return -1
+
+        next_card = body.find(listing_card_marker, max(cursor_at, searched - len(listing_card_marker)))
+        if next_card < 0:
+            return -1
+        return body.rfind(b"<", cursor_at, next_card)
+
+    return end
+
+def read_body(r, stop_at=None):
+    """
+    Read a response in chunks, stopping as soon as stop_at finds the end of the part we parse.
+
+    Args:
+        r: Response fetched with stream=True
+        stop_at: Called as stop_at(body, searched) with the bytes read so far and how many
+                 of them were already searched, returns the end offset or -1 to keep reading
+
+    Returns:
+        Tuple of (body, bytes read, whether reading stopped early)
+    """
+    body = bytearray()
+    try:
+        for chunk in r.iter_content(stream_chunk_size):
+            searched = len(body)
+            body += chunk
+            end = stop_at(body, searched) if stop_at is not None else -1
+            if end >= 0:
+                return bytes(body[:end]), len(body), True
+        return bytes(body), len(body), False
+    finally:
+        # Closing mid-body drops the connection instead of draining the rest of the page
+        r.close()
+
+def read_response(r, span, stop_at=None):
+    span.set_attribute("http.status_code", r.status_code)
+    content, size, truncated = read_body(r, stop_at if stream_responses else None)
+    span.set_attribute("http.response_size", size)
+    span.set_attribute("http.response_truncated", truncated)
+    return content
+
+def parse_content(content, span, target=None):
+    span.set_attribute("html.parser", html_parser)
+    started = time.perf_counter()
+    soup = parse_html(content, target if parse_only_targets else None)
+    app_metrics.html_parse_duration.record((time.perf_counter() - started) * 1000, {"html.parser": html_parser})
+    return soup
+
+def soupify(url, target=None, stop_at=None):
     with tracer.start_as_current_span("html.parse") as span:
         span.set_attribute("http.url", url)
-        r = requests.get(url)
-        span.set_attribute("http.status_code", r.status_code)
-        span.set_attribute("http.response_size", len(r.content))
-        return bs4.BeautifulSoup(r.content, 'html.parser', from_encoding="utf-8")
-
-# Get the posts from https://www.nhl.com/news/topic/situation-room/
-def get_posts():
-    with tracer.start_as_current_span("scraper.get_posts") as span:
-        date_time_string = datetime.now().strftime("%d-%m-%YT%H-%M-%S")
-        url = f"{base_url}/news/topic/situation-room/?date_cache_busting={date_time_string}"
-        print(f"Getting all posts from: {url}")
-        span.set_attribute("scraper.url", url)
-
-        soup = soupify(url)
-        posts = soup.find_all('div', {'class': 'd3-l-col__col-3'})
-        span.set_attribute("scraper.posts_found", len(posts))
-
-        classed_posts = []
-        for post in posts:
-            title = post.find('h3').text
-            url = post.find('a')['href']
-
-            last_update = helpers.get_last_update()
-            if url == last_update:
+        # The host slot covers the whole transfer, parsing happens after it is released
+        with host_slot(url):
+            content = read_response(fetch(url, stream=True), span, stop_at)
+        return parse_content(content, span, target)
+
+def conditional_headers(listing_state):
+    headers = {}
+    if listing_state.get("etag"):
+        headers["If-None-Match"] = listing_state["etag"]
+    if listing_state.get("last_modified"):
+        headers["If-Modified-Since"] = listing_state["last_modified"]
+    return headers
+
+# Hash only the post titles and links, the rest of the page changes on every request
+def listing_hash(listing):
+    digest = hashlib.sha256()
+    for title, url in listing:
+        digest.update(f"{title}\t{url}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+# (title, url) of every post card on a listing page, newest first
+def listing_cards(soup):
+    return [(post.find('h3').text, post.find('a')['href']) for post in soup.find_all('div', {'class': 'd3-l-col__col-3'})]
+
+# Get the posts from a listing page, https://www.nhl.com/news/topic/situation-room/ by default
+def get_posts(listing_url=None):
+    with tracer.start_as_current_span("scraper.get_posts") as span, profiling.profile("scrape", span):
+        listing_url = listing_url or f"{base_url}{listing_path}"
+        print(f"Getting all posts from: {listing_url}")
+        span.set_attribute("scraper.url", listing_url)
+
+        listing_state = helpers.get_listing_state(listing_url)
+
+        # Each listing remembers the newest post it produced, until then the notifier's last update is the cursor
+        cursor = listing_state.get("cursor") or helpers.get_last_update()
+
+        with tracer.start_as_current_span("html.parse") as parse_span:
+            parse_span.set_attribute("http.url", listing_url)
+            with host_slot(listing_url):
+                r = fetch(listing_url, conditional_headers(listing_state), stream=True)
+
+                if r.status_code == 304:
+                    print("Listing not modified, skipping.")
+                    r.close()
+                    parse_span.set_attribute("http.status_code", r.status_code)
+                    span.set_attribute("scraper.listing_cache", "not_modified")
+                    span.set_attribute("scraper.new_posts", 0)
+                    return []
+
+                # Older posts are never read, so the listing ends with the card holding the cursor
+                content = read_response(r, parse_span, listing_end(cursor))
+
+            soup = parse_content(content, parse_span, listing_target)
+
+        listing = listing_cards(soup)
+        span.set_attribute("scraper.posts_found", len(listing))
+        app_metrics.posts_found.add(len(listing))
+        fragment_hash = listing_hash(listing)
+        span.set_attribute("scraper.listing_hash", fragment_hash)
+
+        if fragment_hash == listing_state.get("fragment_hash"):
+            print("Listing unchanged, skipping.")
+            span.set_attribute("scraper.listing_cache", "unchanged")
+            span.set_attribute("scraper.new_posts", 0)
+            return []
+
+        span.set_attribute("scraper.listing_cache", "changed")
+
+        # Without a cursor of its own a listing is only read up to the notifier's last update when that post is on it,
+        # otherwise it is a new source: its posts are stored for the history but flagged so none of them is notified
+        seeding = not listing_state.get("cursor") and listing and cursor not in {url for _, url in listing}
+        if seeding:
+            print(f"New listing, storing its {len(listing)} posts without notifying.")
+            span.set_attribute("scraper.listing_cache", "seeded")
+
+        new_posts = []
+        for title, url in listing:
+            if url == cursor:
                 print("Last update found, breaking", url)
                 break
 
+            new_posts.append((title, url))
+
+        classed_posts = dump_posts(new_posts, span)
+        if seeding:
+            for post in classed_posts:
+                post["seeded"] = True
+
+        # Only remember this listing once every post on it made it through, so failures are retried next cycle
+        if r.status_code == 200 and len(classed_posts) == len(new_posts):
+            helpers.write_listing_state(listing_url, {
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "fragment_hash": fragment_hash,
+                "cursor": listing[0][1] if listing else listing_state.get("cursor"),
+            })
+            # Nothing was ever notified, so the next post after these is the first one to go out
+            if seeding and cursor == "NEVER_UPDATED":
+                helpers.write_last_update(listing[0][1])
+
+        span.set_attribute("scraper.new_posts", len(classed_posts))
+        app_metrics.new_posts.add(len(classed_posts))
+        return classed_posts
+
+def dump_post(title, url):
+    post = Post(title, url).dumps()
+    # Lets the notifier measure scrape-to-send latency
+    post["scraped_at"] = time.time()
+    return post
+
+# Fetch and dump posts over a bounded pool, keeping listing order and skipping any post that fails
+def dump_posts(new_posts, span):
+    with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+        # Each task runs in a copy of the current context so its spans stay children of scraper.get_posts
+        futures = [
+            (url, executor.submit(contextvars.copy_context().run, dump_post, title, url))
+            for title, url in new_posts
+        ]
+
+        classed_posts = []
+        for url, future in futures:
             try:
-                p = Post(title, url)
-                classed_posts.append(p.dumps())
+                classed_posts.append(future.result())
             except Exception as e:
                 print(f"Error safely continuing: {e}")
                 span.add_event("post.processing_error", {"error": str(e), "url": url})
+                app_metrics.errors.add(1, {"stage": "post"})
 
-        span.set_attribute("scraper.new_posts", len(classed_posts))
-        return classed_posts
+    return classed_posts
+
+def run(listing_url=None):
+    posts = get_posts(listing_url)
 
-posts = get_posts()
+    if len(posts) > 0:
+        print("Storing posts...")
+        post_store.append(posts)
+    else:
+        print("No new posts found.")
+    print("Complete!")
+    return posts
 
-if len(posts) > 0:
-    # Write the posts to a file
-    print("Writing posts to file...")
-    with open("storage/posts.json", "w") as f:
-        f.write(json.dumps(posts, indent=4))
-else:
-    print("No new posts found.")
-print("Complete!")
\ No newline at end of file
+if __name__ == "__main__":
+    run()
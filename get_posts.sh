@@ -1,7 +1,5 @@
 #!/bin/bash
 
-while true; do
-  echo "Getting Posts..."
-  python get_posts.py
-  sleep 120
-done
\ No newline at end of file
+# The scraper schedules its own cycles, see scraper_daemon.py
+echo "Starting scraper..."
+exec python scraper_daemon.py
@@ -0,0 +1,63 @@
+"""
+Production serving config for website.py.
+
+    gunicorn -c gunicorn.conf.py website:app
+
+The app is not preloaded: every worker imports website.py itself after it is
+forked, so otel_config.init_telemetry() and the BatchSpanProcessor export
+thread are set up inside each worker instead of being lost across fork().
+
+Configuration via environment variables:
+- WEB_BIND: Address to listen on (default: 0.0.0.0:5000)
+- WEB_CONCURRENCY: Worker processes (default: 2 x available CPUs + 1, at most WEB_MAX_WORKERS)
+- WEB_MAX_WORKERS: Cap on the default worker count (default: 4)
+- WEB_THREADS: Threads per worker (default: 4)
+- WEB_TIMEOUT_SECONDS: Seconds before a silent worker is restarted (default: 30)
+"""
+
+import math
+import os
+
+
+def available_cpus():
+    """CPUs this container may use: its cgroup quota, else its CPU affinity."""
+    try:
+        # cgroup v2, "max 100000" when there is no limit
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        try:
+            # cgroup v1, -1 when there is no limit
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if quota > 0:
+                return max(1, math.ceil(quota / period))
+        except (OSError, ValueError):
+            pass
+
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:5000")
+# Each worker holds its own rulings index and metrics, so the default stays small even on large nodes
+max_workers = int(os.getenv("WEB_MAX_WORKERS", "4"))
+workers = int(os.getenv("WEB_CONCURRENCY", min(available_cpus() * 2 + 1, max_workers)))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "4"))
+timeout = int(os.getenv("WEB_TIMEOUT_SECONDS", "30"))
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+
+def worker_exit(server, worker):
+    # Ship the worker's last spans before it goes away
+    import otel_config
+    otel_config.force_flush()
@@ -1,4 +1,7 @@
 import json
+import os
+
+import post_store
 
 # OpenTelemetry imports
 import otel_config
@@ -11,14 +14,28 @@ def read_json_from_disk(file_name):
         span.set_attribute("file.name", file_name)
         with open(file_name, 'r') as f:
             data = json.load(f)
-            span.set_attribute("file.size_bytes", len(json.dumps(data)))
+            span.set_attribute("file.size_bytes", os.fstat(f.fileno()).st_size)
             return data
 
+# Written aside and renamed so a kill never leaves a torn file
+def write_json_to_disk(file_name, data, indent=None):
+    with open(f"{file_name}.tmp", "w") as f:
+        f.write(json.dumps(data, indent=indent))
+    os.replace(f"{file_name}.tmp", file_name)
+
+# groups.json is only re-read when its mtime changes
+groups_cache = {"mtime": None, "groups": None}
+
 def get_groups():
-    return read_json_from_disk('storage/mounted/groups.json')
+    mtime = os.stat('storage/mounted/groups.json').st_mtime_ns
+    if groups_cache["mtime"] != mtime:
+        groups_cache["groups"] = read_json_from_disk('storage/mounted/groups.json')
+        groups_cache["mtime"] = mtime
+    return groups_cache["groups"]
 
-def get_posts():
-    return read_json_from_disk('storage/posts.json')
+# Enough to reach back past the last update after any realistic gap between notifier runs
+def get_posts(limit=100):
+    return post_store.recent(limit)
 
 def get_last_update():
     return read_json_from_disk('storage/last_update.json')["last_update"]
@@ -27,8 +44,22 @@ def write_last_update(key):
     with tracer.start_as_current_span("file.write_last_update") as span:
         span.set_attribute("file.name", "storage/last_update.json")
         span.set_attribute("last_update.value", key)
-        with open("storage/last_update.json", "w") as f:
-            f.write(json.dumps({"last_update": key}))
+        write_json_to_disk("storage/last_update.json", {"last_update": key})
+
+def get_listing_state(url):
+    if not os.path.exists("storage/listing_state.json"):
+        return {}
+    return read_json_from_disk("storage/listing_state.json").get(url, {})
+
+def write_listing_state(url, state):
+    with tracer.start_as_current_span("file.write_listing_state") as span:
+        span.set_attribute("file.name", "storage/listing_state.json")
+        span.set_attribute("listing.url", url)
+        states = {}
+        if os.path.exists("storage/listing_state.json"):
+            states = read_json_from_disk("storage/listing_state.json")
+        states[url] = state
+        write_json_to_disk("storage/listing_state.json", states, indent=4)
 
 group_to_team = {
     "ANA": "Anaheim Ducks",
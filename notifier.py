@@ -1,95 +1,301 @@
-import requests
 import os
+import time
+from typing import NamedTuple, Optional
+
+import app_metrics
 import helpers
+import outbox
+import profiling
+import pushover
 
 # OpenTelemetry imports
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
 import otel_config
 
-# Initialize OpenTelemetry
-tracer = otel_config.init_telemetry("situation-room-notifier", "1.0.0")
+# Telemetry is initialized in main() so the scraper daemon can import this module under its own provider
+tracer = otel_config.get_tracer(__name__)
+
+# Seconds a group's first pending notification waits for more to merge into one digest, 0 sends right away
+coalesce_window = float(os.getenv("NOTIFIER_COALESCE_SECONDS", "0"))
 
-# Instrument requests library for automatic HTTP tracing
-# Exclude OTEL collector endpoints to prevent instrumentation loops
-RequestsInstrumentor().instrument(
-    excluded_urls=".*v1/traces.*,.*opentelemetry-collector.*"
+# Message lines in the order they are sent, as (post key, label)
+message_fields = (
+    ("short_description", "Desc"),
+    ("challenge_initiator", "Initiated By"),
+    ("type_of_challenge", "Challenge Type"),
+    ("result", "Result"),
+    ("explanation", "Explanation"),
+    ("penalty", "Penalty"),
 )
 
-groups = helpers.get_groups()
-posts = helpers.get_posts()
-last_update = helpers.get_last_update()
+class Notification(NamedTuple):
+    post_url: str
+    title: str
+    message: str
+    scraped_at: Optional[float]
+    # Distinct group keys, home team first
+    groups: tuple
+    unknown_teams: tuple
 
-def update_message(post, key, title, _message):
-    if post[key] is not None:
-        _message += f"<b>{title}</b>: {post[key]}\n"
-    return _message
+# Team abbreviation -> group key, rebuilt only when helpers.get_groups() reloads groups.json
+team_index_cache = (None, {})
 
-with tracer.start_as_current_span("notifier.process_posts") as root_span:
-    root_span.set_attribute("notifier.total_posts", len(posts))
-    root_span.set_attribute("notifier.last_update", last_update)
-    notifications_sent = 0
+def team_index(groups):
+    """Map every team abbreviation, defunct aliases included, to its Pushover group key."""
+    global team_index_cache
+    if team_index_cache[0] is groups:
+        return team_index_cache[1]
 
-    for post in posts:
-        if last_update == "NEVER_UPDATED":
-            print("Never notified, stopping to not spam people.")
-            break
+    index = {}
+    for team, name in helpers.group_to_team.items():
+        if name not in groups:
+            print(f"No group for {name}, posts for {team} are only sent to the other team")
+            continue
+        index[team] = groups[name]
+
+    team_index_cache = (groups, index)
+    return index
+
+def plan(posts, index, last_update):
+    """
+    Notifications for every post newer than last_update, each rendered once.
 
+    Args:
+        posts: Posts newest first, as produced by Post.dumps()
+        index: Team abbreviation -> group key, from team_index()
+        last_update: URL of the newest post already notified
+
+    Returns:
+        List of Notification, newest first
+    """
+    if last_update == "NEVER_UPDATED":
+        print("Never notified, stopping to not spam people.")
+        return []
+
+    notifications = []
+    for post in posts:
         if post["url"] == last_update:
             print("Last update found, breaking", post["url"])
             break
 
-        with tracer.start_as_current_span("notifier.process_post") as post_span:
-            post_span.set_attribute("post.url", post["url"])
-            post_span.set_attribute("post.type", post["type"])
-
-            print()
-            print()
-            print()
-            home = post["home"]
-            away = post["away"]
-
-            print("Teams: ", home, away)
-            post_span.set_attribute("post.home_team", home)
-            post_span.set_attribute("post.away_team", away)
-
-            notification_groups = [groups[helpers.group_to_team[home]], groups[helpers.group_to_team[away]]]
-
-            print(f"notification groups: {notification_groups}")
-
-            title = f"{home} vs {away}: {post['type']}"
-
-            message = update_message(post, "short_description", "Desc", "")
-            message = update_message(post, "challenge_initiator", "Initiated By", message)
-            message = update_message(post, "type_of_challenge", "Challenge Type", message)
-            message = update_message(post, "result", "Result", message)
-            message = update_message(post, "explanation", "Explanation", message)
-            message = update_message(post, "penalty", "Penalty", message)
-
-            for group in notification_groups:
-                with tracer.start_as_current_span("notifier.send_notification") as notify_span:
-                    notify_span.set_attribute("notification.group", group)
-                    notify_span.set_attribute("notification.title", title)
-
-                    print(f"Sending notification to {group}")
-                    r = requests.post("https://api.pushover.net/1/messages.json", data={
-                        "token": os.environ["PUSHOVER_APPLICATION_TOKEN"],
-                        "user": group,
-                        "title": title,
-                        "message": message,
-                        "ttl": 86400,
-                        "html": 1
-                    })
-                    notify_span.set_attribute("http.status_code", r.status_code)
-                    notifications_sent += 1
-
-                    print("Begin Response")
-                    print(r.json())
-                    print("End Response")
-
-    root_span.set_attribute("notifier.notifications_sent", notifications_sent)
-
-helpers.write_last_update(posts[0]["url"])
-print()
-print()
-print()
-print("Complete!")
\ No newline at end of file
+        # Stored when its listing was first seen, before anything on it was notified
+        if post.get("seeded"):
+            continue
+
+        home = index.get(post["home"])
+        away = index.get(post["away"])
+        if home is not None and away is not None:
+            groups = (home,) if home == away else (home, away)
+            unknown_teams = ()
+        else:
+            groups = tuple(group for group in (home, away) if group is not None)
+            unknown_teams = tuple(team for team, group in ((post["home"], home), (post["away"], away)) if group is None)
+            print(f"Unknown team {', '.join(unknown_teams)} in {post['url']}, not notifying it")
+
+        # Rendered once here, every group the post fans out to gets the same payload
+        title = f"{post['home']} vs {post['away']}: {post['type']}"
+        message = "".join([f"<b>{label}</b>: {post[key]}\n" for key, label in message_fields if post[key] is not None])
+        notifications.append(Notification(post["url"], title, message, post.get("scraped_at"), groups, unknown_teams))
+
+    return notifications
+
+# Queue a notification per post and group in the outbox, nothing is sent here
+def enqueue(conn, posts, groups, last_update):
+    with tracer.start_as_current_span("notifier.process_posts") as root_span:
+        root_span.set_attribute("notifier.total_posts", len(posts))
+        root_span.set_attribute("notifier.last_update", last_update)
+        notifications_queued = 0
+
+        # Notifications come back in post order, so each lines up with the post it was rendered from
+        for post, notification in zip(posts, plan(posts, team_index(groups), last_update)):
+            with tracer.start_as_current_span("notifier.process_post") as post_span:
+                post_span.set_attribute("post.url", post["url"])
+                post_span.set_attribute("post.type", post["type"])
+                post_span.set_attribute("post.home_team", post["home"])
+                post_span.set_attribute("post.away_team", post["away"])
+                post_span.set_attribute("notification.groups", len(notification.groups))
+                if notification.unknown_teams:
+                    post_span.set_attribute("post.unknown_teams", notification.unknown_teams)
+                    app_metrics.errors.add(1, {"stage": "unknown_team"})
+
+                print(f"notification groups: {notification.groups}")
+
+                for group in notification.groups:
+                    if outbox.enqueue(conn, notification.post_url, group, notification.title,
+                                      notification.message, notification.scraped_at):
+                        notifications_queued += 1
+
+        root_span.set_attribute("notifier.notifications_queued", notifications_queued)
+
+def digests(rows):
+    """
+    Merge one group's pending rows into as few messages as Pushover's length limit allows.
+
+    Args:
+        rows: Pending outbox rows of a single group, in queue order
+
+    Returns:
+        List of (rows, title, message) sends, follow-ups numbered in the title
+    """
+    if len(rows) == 1:
+        return [((rows[0],), rows[0]["title"], rows[0]["message"])]
+
+    parts = []
+    for row in rows:
+        section = f"<b>{row['title']}</b>\n{row['message']}"
+        if len(section) > pushover.message_limit:
+            section = section[:pushover.message_limit - 3] + "..."
+
+        if parts and len(parts[-1][1]) + 1 + len(section) <= pushover.message_limit:
+            parts[-1][0].append(row)
+            parts[-1][1] += "\n" + section
+        else:
+            parts.append([[row], section])
+
+    sends = []
+    for number, (part_rows, message) in enumerate(parts, start=1):
+        if len(part_rows) == 1:
+            title, message = part_rows[0]["title"], part_rows[0]["message"]
+        else:
+            title = f"{len(part_rows)} Situation Room rulings"
+        if len(parts) > 1:
+            title += f" ({number}/{len(parts)})"
+        sends.append((tuple(part_rows), title[:pushover.title_limit], message))
+    return sends
+
+def coalesced_sends(conn, now):
+    """
+    Digests for every group whose oldest pending row has waited out the coalescing window.
+
+    Returns:
+        Tuple of (sends, seconds until the next held group is due or None)
+    """
+    sends = []
+    next_due = None
+    for rows in outbox.pending_by_group(conn).values():
+        due = rows[0]["created_at"] + coalesce_window - now
+        if due > 0:
+            next_due = due if next_due is None else min(next_due, due)
+            continue
+        sends.extend(digests(rows))
+    return sends, next_due
+
+# Send every pending outbox row, one batch at a time
+def deliver(conn):
+    """
+    Send pending notifications, coalesced per group when NOTIFIER_COALESCE_SECONDS is set.
+
+    Returns:
+        Seconds until held notifications are due, None when nothing is held back
+    """
+    with tracer.start_as_current_span("notifier.deliver") as span, profiling.profile("deliver", span):
+        notifications_sent = 0
+        notifications_failed = 0
+        api_calls = 0
+        max_latency_ms = None
+        next_due = None
+        group_teams = {group: team for team, group in helpers.get_groups().items()}
+
+        if coalesce_window > 0:
+            sends, next_due = coalesced_sends(conn, time.time())
+            batches = [sends[i:i + outbox.batch_size] for i in range(0, len(sends), outbox.batch_size)]
+        else:
+            batches = ([((row,), row["title"], row["message"]) for row in batch] for batch in outbox.pending_batches(conn))
+
+        for batch in batches:
+            futures = [(rows, pushover.submit_message(rows[0]["group_key"], title, message)) for rows, title, message in batch]
+
+            for rows, future in futures:
+                api_calls += 1
+                team = group_teams.get(rows[0]["group_key"], "unknown")
+                try:
+                    r = future.result()
+                except pushover.PushoverError as e:
+                    for row in rows:
+                        print(f"Failed to notify {row['group_key']} (attempt {row['attempts'] + 1}): {e}")
+                        outbox.mark_failed(conn, row["id"], str(e))
+                    notifications_failed += len(rows)
+                    app_metrics.notifications.add(len(rows), {"team": team, "outcome": "failed"})
+                    app_metrics.errors.add(1, {"stage": "notification"})
+                    continue
+
+                for row in rows:
+                    outbox.mark_sent(conn, row["id"])
+
+                    if row["scraped_at"] is not None:
+                        latency_ms = (time.time() - row["scraped_at"]) * 1000
+                        max_latency_ms = max(latency_ms, max_latency_ms or 0)
+                        print(f"Notified {row['group_key']} {latency_ms:.0f}ms after {row['post_url']} was scraped")
+                        span.add_event("notification.sent", {
+                            "post.url": row["post_url"],
+                            "notification.group": row["group_key"],
+                            "notification.scrape_to_send_ms": latency_ms,
+                        })
+                notifications_sent += len(rows)
+                app_metrics.notifications.add(len(rows), {"team": team, "outcome": "sent"})
+                if len(rows) > 1:
+                    app_metrics.api_calls_saved.add(len(rows) - 1, {"team": team})
+                print("Begin Response")
+                print(r.text)
+                print("End Response")
+
+        outbox.prune(conn)
+        if max_latency_ms is not None:
+            span.set_attribute("notifier.max_scrape_to_send_ms", max_latency_ms)
+        span.set_attribute("notifier.notifications_sent", notifications_sent)
+        span.set_attribute("notifier.notifications_failed", notifications_failed)
+        span.set_attribute("notifier.api_calls", api_calls)
+        if next_due is not None:
+            span.set_attribute("notifier.next_due_seconds", next_due)
+        for state, count in outbox.counts(conn).items():
+            span.set_attribute(f"notifier.outbox_{state}", count)
+
+        return next_due
+
+def notify_posts(posts):
+    """
+    Queue notifications for any posts newer than the last update and send everything pending.
+
+    Returns:
+        Seconds until coalesced notifications still held back are due, see deliver()
+    """
+    with tracer.start_as_current_span("notifier.notify_posts") as span, profiling.profile("notify", span):
+        groups = helpers.get_groups()
+        last_update = helpers.get_last_update()
+
+        conn = outbox.connect()
+        try:
+            enqueue(conn, posts, groups, last_update)
+
+            # Everything new is durably queued, so the posts never need to be looked at again
+            helpers.write_last_update(posts[0]["url"])
+
+            return deliver(conn)
+        finally:
+            conn.close()
+
+def deliver_pending():
+    conn = outbox.connect()
+    try:
+        return deliver(conn)
+    finally:
+        conn.close()
+
+def main():
+    otel_config.init_telemetry("situation-room-notifier", "1.0.0")
+
+    # Instrument requests library for automatic HTTP tracing
+    otel_config.instrument_requests()
+
+    next_due = notify_posts(helpers.get_posts())
+
+    # A one-shot run stays until the notifications it held back for coalescing are sent
+    while next_due is not None:
+        time.sleep(next_due)
+        next_due = deliver_pending()
+    print()
+    print()
+    print()
+    print("Complete!")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 #!/bin/bash
 
+# Only needed when the scraper runs with SCRAPER_NOTIFY_INLINE=false,
+# otherwise scraper_daemon.py notifies as soon as posts are scraped.
+
 echo "Waiting 2 minutes for the posts to get gotten..."
 sleep 120
 
@@ -3,29 +3,61 @@ OpenTelemetry configuration and initialization module.
 
 This module handles all OpenTelemetry setup including:
 - Tracer provider initialization
+- Meter provider initialization (OTLP and optional Prometheus export)
 - OTLP exporter configuration
 - Auto-instrumentation setup
 - Environment-based configuration
+
+Only the lightweight OpenTelemetry API is imported at module load. The SDK,
+the selected OTLP exporter and the instrumentation packages are imported
+when tracing is actually enabled, so disabled runs never pay for them and
+enabled runs only load one of the gRPC/HTTP exporters.
 """
 
+import atexit
 import os
 from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
-from opentelemetry.sdk.resources import Resource, SERVICE_NAME, SERVICE_VERSION
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter as GRPCExporter
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter as HTTPExporter
+
+
+def traces_enabled() -> bool:
+    return os.getenv("OTEL_TRACES_ENABLED", "true").lower() == "true"
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("OTEL_METRICS_ENABLED", "false").lower() == "true"
+
+
+def prometheus_enabled() -> bool:
+    return metrics_enabled() and os.getenv("OTEL_PROMETHEUS_ENABLED", "false").lower() == "true"
+
+
+def build_resource(service_name: str, service_version: str):
+    from opentelemetry.sdk.resources import Resource, SERVICE_NAME, SERVICE_VERSION
+
+    return Resource.create({
+        SERVICE_NAME: service_name,
+        SERVICE_VERSION: service_version,
+        "deployment.environment": os.getenv("ENVIRONMENT", "development"),
+    })
 
 
 def init_telemetry(service_name: str, service_version: str = "1.0.0") -> trace.Tracer:
     """
-    Initialize OpenTelemetry tracing for the application.
+    Initialize OpenTelemetry tracing and metrics for the application.
 
     Configuration via environment variables:
     - OTEL_EXPORTER_OTLP_ENDPOINT: OTLP collector endpoint (default: http://localhost:4318)
     - OTEL_EXPORTER_OTLP_PROTOCOL: Protocol to use - 'grpc' or 'http' (default: http)
     - OTEL_TRACES_ENABLED: Enable/disable tracing (default: true)
+    - OTEL_METRICS_ENABLED: Enable/disable metrics, see init_metrics (default: false)
     - OTEL_CONSOLE_EXPORTER: Also export to console for debugging (default: false)
+    - OTEL_SAMPLING_MODE: 'always', 'ratio' (parent-based trace id ratio) or 'tail' (default: always)
+    - OTEL_SAMPLING_RATIO: Share of traces kept in ratio mode, and of routine traces in tail mode (default: 1.0)
+    - OTEL_TAIL_KEEP_ATTRIBUTES: Span attributes that keep a trace in tail mode when truthy
+      (default: scraper.new_posts,notifier.notifications_queued,notifier.notifications_sent,profile.samples)
+    - OTEL_EXIT_FLUSH_TIMEOUT_MILLIS: Longest wait for buffered spans to export at exit (default: 5000)
+    - OTEL_BSP_SCHEDULE_DELAY, OTEL_BSP_MAX_QUEUE_SIZE, OTEL_BSP_MAX_EXPORT_BATCH_SIZE,
+      OTEL_BSP_EXPORT_TIMEOUT: Standard batch processor settings, read by the SDK
 
     Args:
         service_name: Name of the service being instrumented
@@ -34,22 +66,22 @@ def init_telemetry(service_name: str, service_version: str = "1.0.0") -> trace.T
     Returns:
         Configured tracer instance
     """
-    traces_enabled = os.getenv("OTEL_TRACES_ENABLED", "true").lower() == "true"
+    init_metrics(service_name, service_version)
 
-    if not traces_enabled:
+    if not traces_enabled():
+        # No provider is set, so the API hands out no-op tracers
         print(f"[OTEL] Tracing disabled for {service_name}")
-        trace.set_tracer_provider(TracerProvider(resource=Resource.create({SERVICE_NAME: service_name})))
         return trace.get_tracer(__name__)
 
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
     # Configure resource attributes
-    resource = Resource.create({
-        SERVICE_NAME: service_name,
-        SERVICE_VERSION: service_version,
-        "deployment.environment": os.getenv("ENVIRONMENT", "development"),
-    })
+    resource = build_resource(service_name, service_version)
 
-    # Create tracer provider
-    provider = TracerProvider(resource=resource)
+    # Create tracer provider, it is flushed by our own exit hook with a bounded timeout
+    provider = TracerProvider(resource=resource, sampler=build_sampler(), shutdown_on_exit=False)
+    atexit.register(flush_on_exit, provider)
 
     # Configure OTLP exporter
     otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
@@ -60,20 +92,23 @@ def init_telemetry(service_name: str, service_version: str = "1.0.0") -> trace.T
             # HTTP exporter expects endpoints with /v1/traces path
             if not otlp_endpoint.endswith("/v1/traces"):
                 otlp_endpoint = f"{otlp_endpoint.rstrip('/')}/v1/traces"
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter as HTTPExporter
             exporter = HTTPExporter(endpoint=otlp_endpoint)
             print(f"[OTEL] Using HTTP OTLP exporter: {otlp_endpoint}")
         else:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter as GRPCExporter
             exporter = GRPCExporter(endpoint=otlp_endpoint)
             print(f"[OTEL] Using gRPC OTLP exporter: {otlp_endpoint}")
 
-        provider.add_span_processor(BatchSpanProcessor(exporter))
+        provider.add_span_processor(build_processor(BatchSpanProcessor(exporter)))
     except Exception as e:
         print(f"[OTEL] Warning: Failed to configure OTLP exporter: {e}")
         print(f"[OTEL] Traces will not be exported. Check OTEL_EXPORTER_OTLP_ENDPOINT configuration.")
 
     # Optionally add console exporter for debugging
     if os.getenv("OTEL_CONSOLE_EXPORTER", "false").lower() == "true":
-        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        provider.add_span_processor(build_processor(BatchSpanProcessor(ConsoleSpanExporter())))
         print(f"[OTEL] Console exporter enabled")
 
     # Set global tracer provider
@@ -84,6 +119,108 @@ def init_telemetry(service_name: str, service_version: str = "1.0.0") -> trace.T
     return trace.get_tracer(__name__)
 
 
+def init_metrics(service_name: str, service_version: str = "1.0.0") -> None:
+    """
+    Initialize the OpenTelemetry meter provider.
+
+    Instruments (see app_metrics) are created through the API and stay no-ops
+    until this sets a provider. Metrics are opt-in so that, like tracing, a
+    run without them never imports the SDK or an exporter.
+
+    Configuration via environment variables:
+    - OTEL_METRICS_ENABLED: Enable/disable metrics (default: false)
+    - OTEL_PROMETHEUS_ENABLED: Also serve metrics for Prometheus, the website exposes them on /metrics (default: false)
+    - OTEL_METRIC_EXPORT_INTERVAL: Standard OTLP export interval in milliseconds, read by the SDK
+    - OTEL_EXPORTER_OTLP_ENDPOINT / OTEL_EXPORTER_OTLP_PROTOCOL: Shared with tracing
+
+    Args:
+        service_name: Name of the service being instrumented
+        service_version: Version of the service
+    """
+    if not metrics_enabled():
+        print(f"[OTEL] Metrics disabled for {service_name}")
+        return
+
+    from opentelemetry import metrics
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
+    readers = []
+
+    otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+    otlp_protocol = os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "http").lower()
+
+    try:
+        if otlp_protocol == "http":
+            # HTTP exporter expects endpoints with /v1/metrics path
+            if not otlp_endpoint.endswith("/v1/metrics"):
+                otlp_endpoint = f"{otlp_endpoint.rstrip('/')}/v1/metrics"
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter as HTTPMetricExporter
+            exporter = HTTPMetricExporter(endpoint=otlp_endpoint)
+        else:
+            from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter as GRPCMetricExporter
+            exporter = GRPCMetricExporter(endpoint=otlp_endpoint)
+
+        readers.append(PeriodicExportingMetricReader(exporter))
+        print(f"[OTEL] Exporting metrics to {otlp_endpoint}")
+    except Exception as e:
+        print(f"[OTEL] Warning: Failed to configure OTLP metric exporter: {e}")
+
+    if prometheus_enabled():
+        try:
+            from opentelemetry.exporter.prometheus import PrometheusMetricReader
+            readers.append(PrometheusMetricReader())
+            print(f"[OTEL] Prometheus metrics enabled")
+        except ImportError as e:
+            print(f"[OTEL] Warning: Prometheus metrics unavailable: {e}")
+
+    provider = MeterProvider(
+        resource=build_resource(service_name, service_version),
+        metric_readers=readers,
+        shutdown_on_exit=False,
+    )
+    atexit.register(flush_on_exit, provider)
+    metrics.set_meter_provider(provider)
+
+    print(f"[OTEL] Metrics initialized for {service_name} v{service_version}")
+
+
+def build_sampler():
+    """Head sampler for OTEL_SAMPLING_MODE, None leaves the SDK default (or OTEL_TRACES_SAMPLER) in place."""
+    if os.getenv("OTEL_SAMPLING_MODE", "always").lower() != "ratio":
+        return None
+
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    ratio = float(os.getenv("OTEL_SAMPLING_RATIO", "1.0"))
+    print(f"[OTEL] Sampling {ratio:.0%} of traces")
+    return ParentBased(TraceIdRatioBased(ratio))
+
+
+def build_processor(processor):
+    """Wrap a span processor in tail sampling when OTEL_SAMPLING_MODE is 'tail'."""
+    if os.getenv("OTEL_SAMPLING_MODE", "always").lower() != "tail":
+        return processor
+
+    from tail_sampling import TailSamplingSpanProcessor
+
+    ratio = float(os.getenv("OTEL_SAMPLING_RATIO", "1.0"))
+    keep_attributes = [
+        attribute.strip() for attribute in os.getenv(
+            "OTEL_TAIL_KEEP_ATTRIBUTES",
+            "scraper.new_posts,notifier.notifications_queued,notifier.notifications_sent,profile.samples",
+        ).split(",") if attribute.strip()
+    ]
+    print(f"[OTEL] Tail sampling: keeping errors, {', '.join(keep_attributes)} and {ratio:.0%} of the rest")
+    return TailSamplingSpanProcessor(processor, ratio, keep_attributes)
+
+
+def flush_on_exit(provider) -> None:
+    """Export what a tracer or meter provider still buffers without letting an unreachable collector hold up the exit."""
+    provider.force_flush(int(os.getenv("OTEL_EXIT_FLUSH_TIMEOUT_MILLIS", "5000")))
+    provider.shutdown()
+
+
 def get_tracer(name: str) -> trace.Tracer:
     """
     Get a tracer instance for creating manual spans.
@@ -95,3 +232,52 @@ def get_tracer(name: str) -> trace.Tracer:
         Tracer instance
     """
     return trace.get_tracer(name)
+
+
+def instrument_requests() -> None:
+    """
+    Instrument the requests library for automatic HTTP tracing, when tracing is enabled.
+
+    OTEL collector endpoints are excluded to prevent instrumentation loops.
+    """
+    if not traces_enabled():
+        return
+
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+    RequestsInstrumentor().instrument(
+        excluded_urls=".*v1/traces.*,.*opentelemetry-collector.*"
+    )
+
+
+def instrument_flask(app, excluded_urls: str = "") -> None:
+    """
+    Instrument a Flask app for automatic request tracing, when tracing is enabled.
+
+    Args:
+        app: Flask application
+        excluded_urls: Comma separated URL patterns that are not traced
+    """
+    if not traces_enabled():
+        return
+
+    from opentelemetry.instrumentation.flask import FlaskInstrumentor
+    FlaskInstrumentor().instrument_app(app, excluded_urls=excluded_urls)
+
+
+def force_flush(timeout_millis: int = 30000) -> bool:
+    """
+    Export any spans still buffered in the global tracer provider.
+
+    Long-running processes call this once per cycle so a cycle's spans are
+    shipped together instead of waiting for the batch processor's timer.
+
+    Args:
+        timeout_millis: Maximum time to wait for the export to complete
+
+    Returns:
+        True if the flush completed (or there was nothing to flush)
+    """
+    provider = trace.get_tracer_provider()
+    if not hasattr(provider, "force_flush"):
+        return True
+    return provider.force_flush(timeout_millis)
@@ -0,0 +1,126 @@
+"""
+Durable outbound notification queue.
+
+Every notification is stored as one row per (post URL, group key) before
+anything is sent, so a crash or restart never loses an alert and never
+re-sends one that was already delivered: enqueueing the same pair again is
+a no-op, and the drain only picks up rows that are still pending.
+
+Rows move from pending to sent, or back to pending with an incremented
+attempt count when a send fails, until NOTIFIER_OUTBOX_MAX_ATTEMPTS is
+reached and the row is marked failed. The only window for a duplicate push
+is a crash between Pushover accepting a message and the row being marked sent.
+
+Configuration via environment variables:
+- NOTIFIER_OUTBOX_PATH: SQLite database file (default: storage/outbox.sqlite3)
+- NOTIFIER_OUTBOX_BATCH_SIZE: Rows sent per batch (default: 50)
+- NOTIFIER_OUTBOX_MAX_ATTEMPTS: Attempts before a notification is marked failed (default: 5)
+- NOTIFIER_OUTBOX_RETENTION_DAYS: Days sent and failed rows are kept (default: 7)
+"""
+
+import os
+import sqlite3
+import time
+
+outbox_path = os.getenv("NOTIFIER_OUTBOX_PATH", "storage/outbox.sqlite3")
+batch_size = int(os.getenv("NOTIFIER_OUTBOX_BATCH_SIZE", "50"))
+max_attempts = int(os.getenv("NOTIFIER_OUTBOX_MAX_ATTEMPTS", "5"))
+retention_seconds = float(os.getenv("NOTIFIER_OUTBOX_RETENTION_DAYS", "7")) * 86400
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+schema = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    post_url TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    title TEXT NOT NULL,
+    message TEXT NOT NULL,
+    scraped_at REAL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (post_url, group_key)
+);
+CREATE INDEX IF NOT EXISTS notifications_state ON notifications (state, id);
+"""
+
+
+def connect():
+    conn = sqlite3.connect(outbox_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(schema)
+    return conn
+
+
+def enqueue(conn, post_url, group_key, title, message, scraped_at=None):
+    """
+    Queue a notification unless this post was already queued for this group.
+
+    Returns:
+        True if a new row was added
+    """
+    now = time.time()
+    with conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO notifications (post_url, group_key, title, message, scraped_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (post_url, group_key, title, message, scraped_at, now, now),
+        )
+    return cursor.rowcount == 1
+
+
+def pending_batches(conn):
+    """Yield the pending rows in queue order, batch_size at a time, visiting each row once."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT * FROM notifications WHERE state = ? AND id > ? ORDER BY id LIMIT ?",
+            (PENDING, last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+def pending_by_group(conn):
+    """Every pending row grouped by group key, each group in queue order."""
+    groups = {}
+    for row in conn.execute("SELECT * FROM notifications WHERE state = ? ORDER BY id", (PENDING,)):
+        groups.setdefault(row["group_key"], []).append(row)
+    return groups
+
+
+def mark_sent(conn, row_id):
+    with conn:
+        conn.execute(
+            "UPDATE notifications SET state = ?, attempts = attempts + 1, last_error = NULL, updated_at = ? WHERE id = ?",
+            (SENT, time.time(), row_id),
+        )
+
+
+def mark_failed(conn, row_id, error):
+    """Record a failed attempt, the row stays pending until it runs out of attempts."""
+    with conn:
+        conn.execute(
+            "UPDATE notifications SET attempts = attempts + 1, last_error = ?, updated_at = ?, "
+            "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE id = ?",
+            (error, time.time(), max_attempts, FAILED, PENDING, row_id),
+        )
+
+
+def prune(conn):
+    with conn:
+        conn.execute(
+            "DELETE FROM notifications WHERE state != ? AND updated_at < ?",
+            (PENDING, time.time() - retention_seconds),
+        )
+
+
+def counts(conn):
+    return dict(conn.execute("SELECT state, COUNT(*) FROM notifications GROUP BY state").fetchall())
@@ -0,0 +1,94 @@
+"""
+Single-pass field extraction for situation room posts.
+
+The listing title ("Coach's Challenge: TOR @ MTL - 12:34 of the first
+period") and the article body ("Result: ...", "Explanation: ...") are each
+normalized once and scanned once, and the values are kept in small slotted
+records instead of being re-split on every getter call.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# Typographic characters used on nhl.com mapped to their plain equivalents
+replacements = (
+    ("\u2013", "-"),
+    ("\u2019", "'"),
+    ("\u00a0", " "),
+    ("\u201c", '"'),
+    ("\u201d", '"'),
+)
+
+# Label -> position of its value in BodyFields
+body_labels = {
+    "Challenge Initiated By": 0,
+    "Type of Challenge": 1,
+    "Result": 2,
+    "Explanation": 3,
+    "Penalty": 4,
+}
+# The value is captured in a lookahead so a label later on the same line is still found
+body_label_pattern = re.compile("(" + "|".join(re.escape(label) for label in body_labels) + r"): (?=([^\n]*))")
+
+
+def transfigure(text):
+    # Plain ASCII text, most titles and URLs, has nothing to replace
+    if not text.isascii():
+        for old, new in replacements:
+            text = text.replace(old, new)
+    return text.strip()
+
+
+@dataclass(slots=True)
+class TitleFields:
+    type: str
+    home: str
+    away: str
+    short_description: Optional[str]
+
+
+@dataclass(slots=True)
+class BodyFields:
+    challenge_initiator: Optional[str] = None
+    type_of_challenge: Optional[str] = None
+    result: Optional[str] = None
+    explanation: Optional[str] = None
+    penalty: Optional[str] = None
+
+
+def parse_title(text):
+    """
+    Split a normalized listing title into its fields.
+
+    Raises ValueError or IndexError when the title is not in the
+    "Type: HOME @ AWAY - Description" form.
+    """
+    kind, matchup = text.split(": ")[:2]
+    home, away = matchup.split(" @ ")[:2]
+    kind = kind.strip()
+
+    short_description = None
+    if kind != "Officials Update":
+        short_description = text.split("-")[1].strip()
+
+    return TitleFields(kind, home.strip(), away.split("-")[0].strip(), short_description)
+
+
+def parse_body(post_text, kind):
+    """
+    Pull every labeled field out of a normalized article body in one scan.
+
+    Only the first occurrence of each label counts and its value runs to the
+    end of that line. Officials updates have no labels, their whole body is the result.
+    """
+    values = [None] * len(body_labels)
+    for label, value in body_label_pattern.findall(post_text):
+        index = body_labels[label]
+        if values[index] is None:
+            values[index] = value.strip()
+
+    if kind == "Officials Update":
+        values[2] = post_text.strip()
+
+    return BodyFields(*values)
@@ -0,0 +1,199 @@
+"""
+Append-only store of every scraped post, keyed by post URL.
+
+Replaces rewriting storage/posts.json on every cycle. Each post is added
+once, in the order it was published, and gets an increasing sequence number
+that readers use as a cursor to fetch only what was added since their last
+read. Appends happen in a single transaction so readers never see half a
+batch, and WAL mode lets the website read while the scraper writes.
+
+Configuration via environment variables:
+- POST_STORE_PATH: SQLite database file (default: storage/posts.sqlite3)
+"""
+
+import json
+import os
+import sqlite3
+
+import otel_config
+
+tracer = otel_config.get_tracer(__name__)
+
+store_path = os.getenv("POST_STORE_PATH", "storage/posts.sqlite3")
+
+schema = """
+CREATE TABLE IF NOT EXISTS posts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    scraped_at REAL,
+    post TEXT NOT NULL
+)
+"""
+
+
+def connect():
+    conn = sqlite3.connect(store_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(schema)
+    return conn
+
+
+def size_bytes():
+    return os.stat(store_path).st_size if os.path.exists(store_path) else 0
+
+
+def append(posts):
+    """
+    Add a batch of posts, skipping any URL already stored.
+
+    Args:
+        posts: Post dicts newest first, as returned by get_posts.get_posts()
+
+    Returns:
+        Number of posts added
+    """
+    with tracer.start_as_current_span("post_store.append") as span:
+        span.set_attribute("file.name", store_path)
+        conn = connect()
+        try:
+            with conn:
+                # Oldest first so sequence numbers follow publication order
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO posts (url, scraped_at, post) VALUES (?, ?, ?)",
+                    [(post["url"], post.get("scraped_at"), json.dumps(post)) for post in reversed(posts)],
+                )
+            added = cursor.rowcount
+        finally:
+            conn.close()
+
+        span.set_attribute("post_store.added", added)
+        span.set_attribute("file.size_bytes", size_bytes())
+        return added
+
+
+def insert_below(newer_url, posts):
+    """
+    Add a batch of posts published right before an already stored post, skipping any URL already stored.
+
+    Used by backfill.py to fill gaps in history. Sequence numbers of newer
+    posts are shifted up to make room, or continue downwards when the
+    batch is older than everything stored, and the store's generation is
+    bumped so readers holding sequence numbers know to read from the start.
+
+    Args:
+        newer_url: Stored post published right after the batch, None when the batch is newer than everything
+        posts: Post dicts newest first
+
+    Returns:
+        Number of posts added
+    """
+    if newer_url is None:
+        return append(posts)
+
+    with tracer.start_as_current_span("post_store.insert_below") as span:
+        span.set_attribute("file.name", store_path)
+        conn = connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT seq FROM posts WHERE url = ?", (newer_url,)).fetchone()
+                if row is None:
+                    raise ValueError(f"{newer_url} is not stored")
+                anchor = row[0]
+                oldest, newest = conn.execute("SELECT MIN(seq), MAX(seq) FROM posts").fetchone()
+
+                stored = known_in(conn, [post["url"] for post in posts])
+                posts = [post for post in posts if post["url"] not in stored]
+                if len(posts) == 0:
+                    return 0
+
+                if anchor == oldest:
+                    start = anchor - len(posts)
+                else:
+                    # Moved out past every sequence number first, so no step of the shift collides with a stored row
+                    offset = newest - oldest + len(posts) + 1
+                    conn.execute("UPDATE posts SET seq = seq + ? WHERE seq >= ?", (offset + len(posts), anchor))
+                    conn.execute("UPDATE posts SET seq = seq - ? WHERE seq >= ?", (offset, anchor + offset))
+                    start = anchor
+
+                # Oldest first, so sequence numbers follow publication order
+                conn.executemany(
+                    "INSERT INTO posts (seq, url, scraped_at, post) VALUES (?, ?, ?, ?)",
+                    [(start + i, post["url"], post.get("scraped_at"), json.dumps(post)) for i, post in enumerate(reversed(posts))],
+                )
+                conn.execute(f"PRAGMA user_version = {generation_of(conn) + 1}")
+        finally:
+            conn.close()
+
+        span.set_attribute("post_store.added", len(posts))
+        return len(posts)
+
+
+def known_in(conn, urls):
+    found = set()
+    # Stay under SQLite's bound parameter limit
+    for i in range(0, len(urls), 500):
+        chunk = urls[i:i + 500]
+        rows = conn.execute(f"SELECT url FROM posts WHERE url IN ({','.join('?' * len(chunk))})", chunk)
+        found.update(url for url, in rows)
+    return found
+
+
+def generation_of(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def generation():
+    """Changes whenever stored sequence numbers are renumbered or posts are added below existing ones."""
+    conn = connect()
+    try:
+        return generation_of(conn)
+    finally:
+        conn.close()
+
+
+def known(urls):
+    """The subset of urls that are already stored."""
+    conn = connect()
+    try:
+        return known_in(conn, list(urls))
+    finally:
+        conn.close()
+
+
+def since(cursor=None, limit=None):
+    """
+    Read the posts added after a cursor, oldest first.
+
+    Args:
+        cursor: Sequence number of the last post already read, None for everything.
+                Only valid while generation() is unchanged
+        limit: Maximum number of posts to return
+
+    Returns:
+        List of (seq, post) tuples, the last seq is the cursor for the next call
+    """
+    with tracer.start_as_current_span("post_store.since") as span:
+        if cursor is not None:
+            span.set_attribute("post_store.cursor", cursor)
+        conn = connect()
+        try:
+            rows = conn.execute(
+                "SELECT seq, post FROM posts WHERE ? IS NULL OR seq > ? ORDER BY seq LIMIT ?",
+                (cursor, cursor, -1 if limit is None else limit),
+            ).fetchall()
+        finally:
+            conn.close()
+
+        span.set_attribute("post_store.read", len(rows))
+        return [(seq, json.loads(post)) for seq, post in rows]
+
+
+def recent(limit):
+    """The most recently published posts, newest first."""
+    conn = connect()
+    try:
+        rows = conn.execute("SELECT post FROM posts ORDER BY seq DESC LIMIT ?", (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(post) for post, in rows]
@@ -0,0 +1,208 @@
+"""
+On-demand profiling of scrape and notify cycles.
+
+A cycle wrapped in profile() is profiled when PROFILE_ENABLED is set, or
+once after the process receives SIGUSR1 (see install_signal_handler()).
+Otherwise profile() only checks two flags, so it can stay on the hot path.
+
+Profiling samples the stacks of every thread at PROFILE_SAMPLE_INTERVAL_MS,
+so work done on the fetch pool (Post._fill, soupify) and the Pushover send
+pool is covered along with the cycle's own thread. tracemalloc records the
+peak allocation during the cycle. Each profiled cycle writes, under
+PROFILE_DIR:
+
+- <time>-<name>.collapsed: samples as collapsed stacks ("thread;outer;...;inner count"),
+  readable by flamegraph.pl and speedscope
+- <time>-<name>.alloc.txt: peak traced memory and the top allocation sites
+
+Only the newest PROFILE_KEEP cycles are kept. The hottest functions (by
+samples where they were running) and the peak allocation are also set as
+attributes on the cycle's root span.
+
+Configuration via environment variables:
+- PROFILE_ENABLED: Profile every cycle (default: false)
+- PROFILE_DIR: Directory for profile files (default: storage/profiles)
+- PROFILE_KEEP: Number of profiled cycles kept (default: 20)
+- PROFILE_SAMPLE_INTERVAL_MS: Time between stack samples (default: 5)
+- PROFILE_TOP_FUNCTIONS: Hot functions set on the root span (default: 5)
+- PROFILE_TRACEMALLOC: Trace allocations while profiling, slows the cycle down noticeably (default: true)
+"""
+
+import contextlib
+import itertools
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+enabled = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+profile_dir = os.getenv("PROFILE_DIR", "storage/profiles")
+keep = int(os.getenv("PROFILE_KEEP", "20"))
+sample_interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+top_functions = int(os.getenv("PROFILE_TOP_FUNCTIONS", "5"))
+trace_allocations = os.getenv("PROFILE_TRACEMALLOC", "true").lower() == "true"
+
+# Cycle names armed by SIGUSR1, each is profiled once
+armed = set()
+profile_counter = itertools.count()
+# Marks a thread that is inside a profiled cycle, so nested cycles are not profiled twice
+local = threading.local()
+
+# tracemalloc is process wide, it is started by the first profiled cycle and stopped by the last
+tracing_lock = threading.Lock()
+tracing_cycles = 0
+started_tracing = False
+
+# Frames of threads that are only waiting, idle pool workers and joins, are left out of the samples
+idle_files = ("threading.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+
+
+def arm(signum=None, frame=None):
+    # Runs inside the signal handler, so only set the flags; profile() logs
+    armed.update({"scrape", "notify", "deliver"})
+
+
+def install_signal_handler():
+    """Profile the next cycles on SIGUSR1, only callable from the main thread."""
+    signal.signal(signal.SIGUSR1, arm)
+
+
+def start_tracing():
+    global tracing_cycles, started_tracing
+    with tracing_lock:
+        if tracing_cycles == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        tracing_cycles += 1
+        tracemalloc.reset_peak()
+
+
+def stop_tracing():
+    """Returns the peak traced memory and a snapshot of the allocations."""
+    global tracing_cycles, started_tracing
+    with tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        tracing_cycles -= 1
+        if tracing_cycles == 0 and started_tracing:
+            tracemalloc.stop()
+            started_tracing = False
+    return peak, snapshot
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler(threading.Thread):
+    def __init__(self):
+        super().__init__(name="profiler", daemon=True)
+        self.stop_event = threading.Event()
+        self.stacks = Counter()
+        self.leaves = Counter()
+
+    def run(self):
+        while not self.stop_event.wait(sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident or frame.f_code.co_filename.endswith(idle_files):
+                    continue
+
+                self.leaves[frame_label(frame)] += 1
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+def rotate():
+    cycles = sorted({
+        name.removesuffix(suffix)
+        for name in os.listdir(profile_dir)
+        for suffix in (".collapsed", ".alloc.txt")
+        if name.endswith(suffix)
+    })
+    for cycle in cycles[:max(len(cycles) - keep, 0)]:
+        for suffix in (".collapsed", ".alloc.txt"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(profile_dir, cycle + suffix))
+
+
+def write_profile(name, sampler, peak, snapshot):
+    os.makedirs(profile_dir, exist_ok=True)
+    # Milliseconds and a counter so cycles ending in the same second never
+    # overwrite each other, while names still sort by time for rotate()
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+    path = os.path.join(profile_dir, f"{stamp}-{next(profile_counter):04d}-{name}")
+
+    with open(f"{path}.collapsed", "w") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    if snapshot is not None:
+        with open(f"{path}.alloc.txt", "w") as f:
+            f.write(f"Peak traced memory: {peak} bytes\n\n")
+            for stat in snapshot.statistics("lineno")[:25]:
+                f.write(f"{stat}\n")
+
+    rotate()
+    return path
+
+
+@contextlib.contextmanager
+def profile(name, span):
+    """
+    Profile the enclosed cycle when profiling is on or armed for this cycle name.
+
+    Args:
+        name: Cycle name, used in the file names and to consume a SIGUSR1 arm
+        span: Root span of the cycle, receives the profile.* attributes
+    """
+    if not (enabled or name in armed) or getattr(local, "active", False):
+        yield
+        return
+
+    if name in armed:
+        armed.discard(name)
+        print(f"Profiling the {name} cycle, armed by SIGUSR1")
+    local.active = True
+
+    if trace_allocations:
+        start_tracing()
+
+    sampler = Sampler()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop_event.set()
+        sampler.join()
+        local.active = False
+
+        peak, snapshot = stop_tracing() if trace_allocations else (None, None)
+
+        samples = sum(sampler.leaves.values())
+        hot = [
+            f"{label} {count * 100 / samples:.1f}%"
+            for label, count in sampler.leaves.most_common(top_functions)
+        ]
+
+        try:
+            path = write_profile(name, sampler, peak, snapshot)
+            print(f"Profile of {name} written to {path}.collapsed")
+            span.set_attribute("profile.file", f"{path}.collapsed")
+        except OSError as e:
+            print(f"Could not write the profile of {name}: {e}")
+
+        span.set_attribute("profile.samples", samples)
+        if hot:
+            span.set_attribute("profile.top_functions", hot)
+        if peak is not None:
+            span.set_attribute("profile.peak_alloc_bytes", peak)
@@ -0,0 +1,202 @@
+"""
+Pushover API client shared by the notifier and the website.
+
+Sends go through one pooled requests.Session and a bounded thread pool so
+notifications for several games go out together instead of one after
+another. Every response's X-Limit-App-* headers are tracked so sends are
+held back (or refused) before the application limit is hit, and 429/5xx
+responses or connection errors are retried with exponential backoff.
+
+Configuration via environment variables:
+- PUSHOVER_API_URL: API base URL, point it at a local stub for testing (default: https://api.pushover.net/1)
+- PUSHOVER_MAX_CONCURRENT_SENDS: Messages sent at the same time (default: 4)
+- PUSHOVER_MAX_RETRIES: Retries after a 429/5xx response or connection error (default: 3)
+- PUSHOVER_RETRY_BACKOFF_SECONDS: Delay before the first retry, doubled after each attempt (default: 1)
+- PUSHOVER_LIMIT_RESERVE: Remaining app messages kept in reserve before throttling (default: 0)
+- PUSHOVER_MAX_THROTTLE_SECONDS: Longest wait for the limit to reset before refusing to send (default: 60)
+- PUSHOVER_REQUEST_TIMEOUT_SECONDS: Timeout for each request (default: 15)
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import app_metrics
+import otel_config
+
+tracer = otel_config.get_tracer(__name__)
+
+api_url = os.getenv("PUSHOVER_API_URL", "https://api.pushover.net/1").rstrip("/")
+max_concurrent_sends = int(os.getenv("PUSHOVER_MAX_CONCURRENT_SENDS", "4"))
+max_retries = int(os.getenv("PUSHOVER_MAX_RETRIES", "3"))
+retry_backoff = float(os.getenv("PUSHOVER_RETRY_BACKOFF_SECONDS", "1"))
+limit_reserve = int(os.getenv("PUSHOVER_LIMIT_RESERVE", "0"))
+max_throttle_seconds = float(os.getenv("PUSHOVER_MAX_THROTTLE_SECONDS", "60"))
+request_timeout = float(os.getenv("PUSHOVER_REQUEST_TIMEOUT_SECONDS", "15"))
+
+# Longest title and message Pushover accepts, in characters
+title_limit = 250
+message_limit = 1024
+
+session = requests.Session()
+session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=max_concurrent_sends))
+session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max_concurrent_sends))
+
+executor = ThreadPoolExecutor(max_workers=max_concurrent_sends, thread_name_prefix="pushover")
+
+# Last X-Limit-App-Remaining/Reset seen, remaining is decremented locally for sends still in flight
+limits = {"remaining": None, "reset": None}
+limits_lock = threading.Lock()
+
+
+class PushoverError(Exception):
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class RateLimited(PushoverError):
+    pass
+
+
+def update_limits(r):
+    remaining = r.headers.get("X-Limit-App-Remaining")
+    reset = r.headers.get("X-Limit-App-Reset")
+    if remaining is None or reset is None:
+        return
+    with limits_lock:
+        limits["remaining"] = int(remaining)
+        limits["reset"] = float(reset)
+
+
+def wait_for_capacity():
+    with limits_lock:
+        remaining, reset = limits["remaining"], limits["reset"]
+        if remaining is None or remaining > limit_reserve:
+            if remaining is not None:
+                limits["remaining"] -= 1
+            return
+
+    wait = reset - time.time()
+    if wait <= 0:
+        return
+    if wait > max_throttle_seconds:
+        raise RateLimited(f"Pushover app limit reached, resets in {wait:.0f}s")
+
+    print(f"Pushover app limit reached, waiting {wait:.1f}s for it to reset")
+    time.sleep(wait)
+
+
+def retry_delay(r, attempt):
+    if r is not None and r.headers.get("Retry-After", "").isdigit():
+        return float(r.headers["Retry-After"])
+    return retry_backoff * (2 ** attempt)
+
+
+def post(path, data, idempotent=True):
+    """
+    POST to the Pushover API, retrying 429/5xx responses and connection errors.
+
+    Args:
+        path: API path relative to PUSHOVER_API_URL, e.g. "messages.json"
+        data: Form fields, the application token is added automatically
+        idempotent: False for calls that must not run twice, only 429 responses are
+                    retried since a 5xx or lost connection may still have gone through
+
+    Returns:
+        The successful response
+
+    Raises:
+        RateLimited: The app limit is exhausted and does not reset soon enough
+        PushoverError: The request still failed after all retries
+    """
+    data = {"token": os.environ["PUSHOVER_APPLICATION_TOKEN"], **data}
+
+    for attempt in range(max_retries + 1):
+        wait_for_capacity()
+
+        r = None
+        try:
+            r = session.post(f"{api_url}/{path}", data=data, timeout=request_timeout)
+        except requests.RequestException as e:
+            error = PushoverError(f"Request to {path} failed: {e}")
+        else:
+            update_limits(r)
+            if r.status_code < 400:
+                return r
+            error = PushoverError(f"{path} returned {r.status_code}: {r.text}", r)
+            if r.status_code != 429 and r.status_code < 500:
+                raise error
+
+        if not idempotent and (r is None or r.status_code != 429):
+            raise error
+
+        if attempt < max_retries:
+            delay = retry_delay(r, attempt)
+            print(f"{error}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    raise error
+
+
+def send_message(group, title, message):
+    with tracer.start_as_current_span("notifier.send_notification") as span:
+        span.set_attribute("notification.group", group)
+        span.set_attribute("notification.title", title)
+
+        print(f"Sending notification to {group}")
+        started = time.perf_counter()
+        try:
+            r = post("messages.json", {
+                "user": group,
+                "title": title,
+                "message": message,
+                "ttl": 86400,
+                "html": 1
+            })
+        except PushoverError as e:
+            app_metrics.notification_send_duration.record((time.perf_counter() - started) * 1000, {"outcome": "failed"})
+            if e.response is not None:
+                span.set_attribute("http.status_code", e.response.status_code)
+            raise
+
+        app_metrics.notification_send_duration.record((time.perf_counter() - started) * 1000, {"outcome": "sent"})
+        span.set_attribute("http.status_code", r.status_code)
+        return r
+
+
+def submit_message(group, title, message):
+    """Queue a message on the send pool, the returned future resolves to the response."""
+    return executor.submit(contextvars.copy_context().run, send_message, group, title, message)
+
+
+def add_user(group_key, user, memo):
+    with tracer.start_as_current_span("pushover.add_user") as span:
+        span.set_attribute("pushover.group", group_key)
+        r = post(f"groups/{group_key}/add_user.json", {
+            "user": user,
+            "memo": memo
+        })
+        span.set_attribute("http.status_code", r.status_code)
+        return r
+
+
+def create_group(name):
+    """Create a delivery group and return its key."""
+    with tracer.start_as_current_span("pushover.create_group") as span:
+        span.set_attribute("pushover.group_name", name)
+        # Creating a group twice makes a duplicate, so a failure is left to the caller
+        r = post("groups.json", {"name": name}, idempotent=False)
+        span.set_attribute("http.status_code", r.status_code)
+
+        try:
+            body = r.json()
+        except ValueError:
+            raise PushoverError(f"Creating group {name} returned a non-JSON body: {r.text}", r)
+        if body.get("status") != 1 or not body.get("group"):
+            raise PushoverError(f"Creating group {name} failed: {r.text}", r)
+        return body["group"]
@@ -0,0 +1,149 @@
+"""
+In-memory index of past rulings for the website's JSON API.
+
+Posts are loaded from post_store once and then picked up incrementally with
+post_store.since(), at most once every RULINGS_REFRESH_SECONDS, so polling
+the API during a game does not touch disk on every request. Posts are kept
+in publication order with per-team and per-type lists of positions, and
+pages are returned newest first with the post_store sequence number of the
+last post as the cursor for the next page, so a cursor means the same to
+every worker. When backfill.py stores posts below existing ones the store's
+generation changes and the index is rebuilt from scratch.
+
+Rendered pages are kept in a small LRU keyed by the query and the number of
+indexed posts, so a repeated query is served without re-serializing and a
+new post naturally retires every stale page.
+
+Configuration via environment variables:
+- RULINGS_REFRESH_SECONDS: Minimum time between reads of new posts (default: 5)
+- RULINGS_PAGE_SIZE: Default number of rulings per page (default: 50)
+- RULINGS_MAX_PAGE_SIZE: Largest page a client may ask for (default: 200)
+- RULINGS_CACHE_SIZE: Number of rendered pages kept (default: 256)
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+
+import post_store
+
+refresh_interval = float(os.getenv("RULINGS_REFRESH_SECONDS", "5"))
+page_size = int(os.getenv("RULINGS_PAGE_SIZE", "50"))
+max_page_size = int(os.getenv("RULINGS_MAX_PAGE_SIZE", "200"))
+cache_size = int(os.getenv("RULINGS_CACHE_SIZE", "256"))
+
+lock = threading.Lock()
+
+# Posts in publication order, a post's position in this list is its cursor
+posts = []
+# post_store sequence number of each post, ascending, these are the cursors handed to clients
+seqs = []
+# Team abbreviation / post type -> ascending positions in posts
+by_team = {}
+by_type = {}
+
+store_cursor = None
+store_generation = None
+refreshed_at = None
+
+
+def add(seq, post):
+    position = len(posts)
+    posts.append(post)
+    seqs.append(seq)
+    for team in {post["home"], post["away"]}:
+        by_team.setdefault(team, []).append(position)
+    by_type.setdefault(post["type"], []).append(position)
+
+
+def refresh():
+    """
+    Index posts stored since the last refresh.
+
+    Returns:
+        Tuple of (store generation, number of indexed posts), identifying the index contents
+    """
+    global store_cursor, store_generation, refreshed_at
+    with lock:
+        now = time.monotonic()
+        if refreshed_at is None or now - refreshed_at >= refresh_interval:
+            refreshed_at = now
+
+            # Backfilled posts land below stored ones, which only a full rebuild picks up
+            generation = post_store.generation()
+            if generation != store_generation:
+                posts.clear()
+                seqs.clear()
+                by_team.clear()
+                by_type.clear()
+                store_cursor = None
+                store_generation = generation
+
+            for seq, post in post_store.since(store_cursor):
+                add(seq, post)
+                store_cursor = seq
+        return store_generation, len(posts)
+
+
+def candidates(team, post_type):
+    """Ascending positions matching the filters, None meaning every post."""
+    if team is None and post_type is None:
+        return None
+    if team is None:
+        return by_type.get(post_type, [])
+    if post_type is None:
+        return by_team.get(team, [])
+
+    # Walk the shorter list and check the other filter on the post itself
+    team_positions = by_team.get(team, [])
+    type_positions = by_type.get(post_type, [])
+    if len(team_positions) <= len(type_positions):
+        return [p for p in team_positions if posts[p]["type"] == post_type]
+    return [p for p in type_positions if team in (posts[p]["home"], posts[p]["away"])]
+
+
+@lru_cache(maxsize=cache_size)
+def render(version, team, post_type, cursor, limit):
+    """
+    Render one page of rulings as JSON.
+
+    Args:
+        version: (store generation, number of indexed posts) from refresh(), part of the cache
+                 key so new posts and rebuilds invalidate pages
+        team: Team abbreviation or None
+        post_type: Post type or None
+        cursor: Sequence number from a previous page, only older rulings are returned, None for the newest
+        limit: Maximum number of rulings on the page
+
+    Returns:
+        Tuple of (body, etag)
+    """
+    _, indexed = version
+    with lock:
+        # A rebuild since refresh() leaves a different index behind, render what is there now
+        indexed = min(indexed, len(posts))
+        positions = candidates(team, post_type)
+        end = indexed if cursor is None else bisect.bisect_left(seqs, cursor, hi=indexed)
+        if positions is None:
+            page = list(range(end - 1, max(end - limit, 0) - 1, -1))
+        else:
+            # Posts indexed by a refresh since this call started are left for the next query
+            stop = bisect.bisect_left(positions, end, hi=bisect.bisect_left(positions, indexed))
+            page = positions[max(stop - limit, 0):stop][::-1]
+        more = len(page) > 0 and page[-1] > (0 if positions is None else positions[0])
+        body = json.dumps({
+            "rulings": [posts[p] for p in page],
+            "next_cursor": seqs[page[-1]] if more else None,
+        })
+
+    return body, hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]
+
+
+def query(team=None, post_type=None, cursor=None, limit=None):
+    """A page of rulings newest first, see render() for the arguments and result."""
+    limit = min(limit or page_size, max_page_size)
+    return render(refresh(), team, post_type, cursor, limit)
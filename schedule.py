@@ -0,0 +1,144 @@
+"""
+Scrape sources and adaptive polling cadence.
+
+Each source is a listing page with its own cadence and cursor (the cursor
+lives in storage/listing_state.json next to the listing's cache validators).
+A source is polled at its live interval while NHL games are in progress or
+it has produced a post recently, at its idle interval on game days outside
+games, and at its offseason interval when the schedule has no games coming up.
+
+Game times come from the NHL schedule API and are cached in
+storage/schedule.json, refreshed every few hours. When the schedule cannot
+be fetched the cached copy is used, and without any copy only the observed
+post frequency is used.
+
+Sources are read from SCRAPER_SOURCES_FILE when it exists, a JSON list like:
+
+    [{"name": "situation-room", "url": "https://www.nhl.com/news/topic/situation-room/",
+      "live_interval_seconds": 15, "idle_interval_seconds": 120, "offseason_interval_seconds": 3600}]
+
+Interval keys are optional and default to the variables below.
+
+Configuration via environment variables:
+- SCRAPER_SOURCES_FILE: JSON list of sources (default: storage/mounted/sources.json)
+- SCRAPER_LIVE_INTERVAL_SECONDS: Default live interval (default: 15)
+- SCRAPER_INTERVAL_SECONDS: Default idle interval (default: 120)
+- SCRAPER_OFFSEASON_INTERVAL_SECONDS: Default offseason interval (default: 3600)
+- SCRAPER_ACTIVITY_WINDOW_SECONDS: How long after a new post a source stays at its live interval (default: 900)
+- SCHEDULE_URL: NHL schedule endpoint (default: https://api-web.nhle.com/v1/schedule/now)
+- SCHEDULE_REFRESH_SECONDS: Age at which the cached schedule is refreshed (default: 21600)
+- SCHEDULE_GAME_HOURS: Hours after puck drop a game counts as live (default: 3.5)
+"""
+
+import json
+import os
+from datetime import datetime
+
+import requests
+
+import get_posts
+import helpers
+
+sources_file = os.getenv("SCRAPER_SOURCES_FILE", "storage/mounted/sources.json")
+live_interval = float(os.getenv("SCRAPER_LIVE_INTERVAL_SECONDS", "15"))
+idle_interval = float(os.getenv("SCRAPER_INTERVAL_SECONDS", "120"))
+offseason_interval = float(os.getenv("SCRAPER_OFFSEASON_INTERVAL_SECONDS", "3600"))
+activity_window = float(os.getenv("SCRAPER_ACTIVITY_WINDOW_SECONDS", "900"))
+
+schedule_url = os.getenv("SCHEDULE_URL", "https://api-web.nhle.com/v1/schedule/now")
+schedule_file = "storage/schedule.json"
+schedule_refresh = float(os.getenv("SCHEDULE_REFRESH_SECONDS", "21600"))
+game_seconds = float(os.getenv("SCHEDULE_GAME_HOURS", "3.5")) * 3600
+
+# Warmups and early reviews, a game is treated as live shortly before puck drop
+pregame_seconds = 15 * 60
+
+
+class Source:
+    def __init__(self, name, url, live_interval_seconds=None, idle_interval_seconds=None,
+                 offseason_interval_seconds=None):
+        self.name = name
+        self.url = url
+        self.live_interval = live_interval_seconds or live_interval
+        self.idle_interval = idle_interval_seconds or idle_interval
+        self.offseason_interval = offseason_interval_seconds or offseason_interval
+
+        self.next_run = 0.0
+        self.last_new_post_at = None
+
+
+def load_sources():
+    if not os.path.exists(sources_file):
+        return [Source("situation-room", f"{get_posts.base_url}{get_posts.listing_path}")]
+
+    with open(sources_file, "r") as f:
+        return [Source(**source) for source in json.load(f)]
+
+
+def fetch_game_starts():
+    r = requests.get(schedule_url, timeout=15)
+    r.raise_for_status()
+    return [
+        game["startTimeUTC"]
+        for day in r.json().get("gameWeek", [])
+        for game in day.get("games", [])
+    ]
+
+
+def read_cached_schedule():
+    try:
+        with open(schedule_file, "r") as f:
+            cached = json.load(f)
+        float(cached["fetched_at"])
+        return cached
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring unreadable {schedule_file}: {e}")
+        return None
+
+
+def write_cached_schedule(cached):
+    helpers.write_json_to_disk(schedule_file, cached)
+
+
+def game_starts(now):
+    """Puck drop times as epoch seconds, from the cached schedule refreshed when stale, None when unknown."""
+    cached = read_cached_schedule()
+
+    if cached is None or now - cached["fetched_at"] > schedule_refresh:
+        try:
+            cached = {"fetched_at": now, "game_starts": fetch_game_starts()}
+            write_cached_schedule(cached)
+        except Exception as e:
+            print(f"Could not refresh the game schedule, using the cached copy: {e}")
+
+    if cached is None:
+        return None
+    try:
+        return [datetime.fromisoformat(start.replace("Z", "+00:00")).timestamp() for start in cached["game_starts"]]
+    except (KeyError, TypeError, AttributeError, ValueError) as e:
+        print(f"Ignoring malformed game schedule: {e}")
+        return None
+
+
+def interval_for(source, now, starts):
+    """
+    Seconds until the source should be polled again.
+
+    Args:
+        source: Source that was just polled
+        now: Current epoch time
+        starts: Puck drop times from game_starts(), None when the schedule is unknown
+    """
+    if source.last_new_post_at is not None and now - source.last_new_post_at < activity_window:
+        return source.live_interval
+
+    if starts is None:
+        return source.idle_interval
+
+    if any(start - pregame_seconds <= now <= start + game_seconds for start in starts):
+        return source.live_interval
+    if any(start > now for start in starts):
+        return source.idle_interval
+    return source.offseason_interval
@@ -0,0 +1,135 @@
+"""
+Resident scraper process.
+
+Runs get_posts.run() on an in-process schedule instead of spawning a fresh
+interpreter every cycle, so imports, telemetry setup and the keep-alive
+connections to nhl.com are only paid for once. Every listing source is
+polled on its own cadence, fast while games are live and slow otherwise
+(see schedule.py).
+
+New posts are handed straight to a notifier thread in the same process, so
+they are queued and sent within milliseconds of being scraped instead of
+waiting for the notifier's own poll of storage/posts.json. While idle the
+notifier thread retries anything still pending in the outbox.
+
+Configuration via environment variables:
+- SCRAPER_JITTER_SECONDS: Random +/- offset applied to each interval, never more than a quarter of it (default: 10)
+- SCRAPER_NOTIFY_INLINE: Notify from this process instead of a separate notifier.py loop (default: true)
+- NOTIFIER_RETRY_INTERVAL_SECONDS: How often pending outbox rows are retried while idle (default: 120)
+
+Send SIGUSR1 to profile the next scrape and notify cycles, see profiling.py.
+"""
+
+import os
+import queue
+import random
+import signal
+import threading
+import time
+
+import get_posts
+import notifier
+import otel_config
+import profiling
+import schedule
+
+stop_event = threading.Event()
+
+notify_inline = os.getenv("SCRAPER_NOTIFY_INLINE", "true").lower() == "true"
+retry_interval = float(os.getenv("NOTIFIER_RETRY_INTERVAL_SECONDS", "120"))
+
+# Batches of freshly scraped posts, None tells the notifier thread to stop
+notify_queue = queue.Queue()
+
+
+def handle_shutdown(signum, frame):
+    print(f"Received signal {signum}, stopping after the current cycle...")
+    stop_event.set()
+
+
+def with_jitter(interval, jitter):
+    jitter = min(jitter, interval / 4)
+    return max(0.0, interval + random.uniform(-jitter, jitter))
+
+
+def run_cycle(source):
+    try:
+        # Posts seeded from a newly added listing are stored but never notified
+        posts = [post for post in get_posts.run(source.url) if not post.get("seeded")]
+        if len(posts) > 0:
+            source.last_new_post_at = time.time()
+            if notify_inline:
+                notify_queue.put(posts)
+    except Exception as e:
+        print(f"Scrape cycle for {source.name} failed, retrying next cycle: {e}")
+    finally:
+        otel_config.force_flush()
+
+
+def notify_forever():
+    # Held back coalesced notifications shorten the wait so they go out when their window closes
+    timeout = retry_interval
+    while True:
+        try:
+            posts = notify_queue.get(timeout=timeout)
+        except queue.Empty:
+            posts = []
+
+        if posts is None:
+            return
+
+        next_due = None
+        try:
+            if len(posts) > 0:
+                next_due = notifier.notify_posts(posts)
+            else:
+                next_due = notifier.deliver_pending()
+        except Exception as e:
+            print(f"Notifying failed, pending notifications are retried later: {e}")
+        finally:
+            otel_config.force_flush()
+
+        timeout = retry_interval if next_due is None else min(retry_interval, next_due)
+
+
+def run_forever(sources, jitter):
+    while not stop_event.is_set():
+        source = min(sources, key=lambda s: s.next_run)
+        if stop_event.wait(max(0.0, source.next_run - time.time())):
+            break
+
+        started = time.time()
+        run_cycle(source)
+
+        # The schedule only tunes the cadence, a failure there must never stop scraping
+        try:
+            interval = schedule.interval_for(source, time.time(), schedule.game_starts(time.time()))
+        except Exception as e:
+            print(f"Could not pick the interval for {source.name}, using its idle interval: {e}")
+            interval = source.idle_interval
+        source.next_run = started + with_jitter(interval, jitter)
+        print(f"Next scrape of {source.name} in {source.next_run - time.time():.1f}s")
+
+    print("Scraper stopped.")
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+    profiling.install_signal_handler()
+
+    sources = schedule.load_sources()
+    jitter = float(os.getenv("SCRAPER_JITTER_SECONDS", "10"))
+
+    notifier_thread = None
+    if notify_inline:
+        notifier_thread = threading.Thread(target=notify_forever, name="notifier")
+        notifier_thread.start()
+
+    # The notifier thread keeps the process alive, so it is stopped however the loop ends
+    try:
+        run_forever(sources, jitter)
+    finally:
+        if notifier_thread is not None:
+            notify_queue.put(None)
+            notifier_thread.join()
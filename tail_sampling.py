@@ -0,0 +1,79 @@
+"""
+In-process tail sampling for the OpenTelemetry SDK.
+
+Spans are held back per trace until the trace's local root span ends, then
+the whole trace is either passed on to the wrapped processor or dropped:
+
+- traces with an error (an ERROR status or an error/exception event) are always kept
+- traces where any span carries one of the keep attributes with a truthy
+  value, e.g. a scrape cycle that found new posts, are always kept
+- every other (routine) trace is kept with the configured ratio
+
+Spans that end after their root (background sends) follow the decision made
+for their trace. Only imported by otel_config when tracing is enabled.
+"""
+
+import threading
+from collections import OrderedDict
+
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.trace import StatusCode
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    def __init__(self, delegate, ratio, keep_attributes, max_traces=1000):
+        self.delegate = delegate
+        self.bound = round(max(0.0, min(1.0, ratio)) * (2 ** 64 - 1))
+        self.keep_attributes = keep_attributes
+        self.max_traces = max_traces
+
+        # trace id -> spans waiting for their root, and trace id -> keep decision
+        self.pending = OrderedDict()
+        self.decisions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        self.delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        trace_id = span.context.trace_id
+
+        with self.lock:
+            if trace_id in self.decisions:
+                spans, keep = [span], self.decisions[trace_id]
+            else:
+                self.pending.setdefault(trace_id, []).append(span)
+                if len(self.pending) > self.max_traces:
+                    # A root that never ends would otherwise grow the buffer forever
+                    self.pending.popitem(last=False)
+
+                if span.parent is not None and not span.parent.is_remote:
+                    return
+
+                spans = self.pending.pop(trace_id)
+                keep = self.should_keep(trace_id, spans)
+                self.decisions[trace_id] = keep
+                if len(self.decisions) > self.max_traces:
+                    self.decisions.popitem(last=False)
+
+        if keep:
+            for finished in spans:
+                self.delegate.on_end(finished)
+
+    def should_keep(self, trace_id, spans):
+        for span in spans:
+            if span.status.status_code == StatusCode.ERROR:
+                return True
+            if any("error" in event.name or event.name == "exception" for event in span.events):
+                return True
+            if any(span.attributes.get(key) for key in self.keep_attributes):
+                return True
+
+        # Same rule as TraceIdRatioBased, so a trace id always gets the same answer
+        return (trace_id & (2 ** 64 - 1)) < self.bound
+
+    def shutdown(self):
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self.delegate.force_flush(timeout_millis)
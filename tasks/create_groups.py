@@ -1,65 +1,93 @@
-import requests
+"""
+Create the Pushover delivery group of every team that does not have one yet.
+
+Teams come from helpers.group_to_team (aliases such as ARI share their
+team's group). Groups already listed in the groups file are left alone,
+the missing ones are created a few at a time, and the file is rewritten
+after each group is created, so a failure or a kill midway never loses a
+group key and a rerun only creates what is still missing. Creation is not
+retried automatically: a request that timed out may still have created its
+group, so check the Pushover dashboard for duplicates before rerunning
+after errors other than a clear rejection.
+
+Check it against the local stub before touching the real account:
+
+    python tasks/pushover_stub.py &
+    PUSHOVER_API_URL=http://127.0.0.1:8099/1 PUSHOVER_APPLICATION_TOKEN=test \
+        python tasks/create_groups.py --groups-file /tmp/groups.json
+
+Usage:
+    python tasks/create_groups.py [--groups-file storage/mounted/groups.json] [--workers 4]
+"""
+
+import argparse
 import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+# The application token used to be read from PUSHOVER_API_TOKEN
+if "PUSHOVER_API_TOKEN" in os.environ:
+    os.environ.setdefault("PUSHOVER_APPLICATION_TOKEN", os.environ["PUSHOVER_API_TOKEN"])
+
+import helpers  # noqa: E402
+import pushover  # noqa: E402
+
+
+def read_groups(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_groups(path, groups):
+    helpers.write_json_to_disk(path, groups, indent=4)
+
+
+def create_missing(path, workers):
+    """
+    Create a group for every team missing from the groups file.
+
+    Returns:
+        Names of the teams whose group could not be created
+    """
+    groups = read_groups(path)
+    missing = sorted(set(helpers.group_to_team.values()) - set(groups))
+    print(f"{len(groups)} groups exist, creating {len(missing)}")
+
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(pushover.create_group, team): team for team in missing}
+        for future in as_completed(futures):
+            team = futures[future]
+            try:
+                group_key = future.result()
+            # Anything else raised must not stop the loop, groups still in flight would never be saved
+            except Exception as e:
+                print(f"Failed to create group {team}: {e}")
+                failed.append(team)
+                continue
+
+            # Results are handled on this thread only, so the file is written by one writer at a time
+            groups[team] = group_key
+            write_groups(path, groups)
+            print(f"Created group {team}: {group_key}")
+
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups-file", default="storage/mounted/groups.json")
+    parser.add_argument("--workers", type=int, default=pushover.max_concurrent_sends)
+    args = parser.parse_args()
 
-# Function to create pushover group
-def create_group(name):
-    url = f"https://api.pushover.net/1/groups.json?token={os.environ['PUSHOVER_API_TOKEN']}"
-    data = {
-        "name": name
-    }
-    response = requests.post(url, data=data)
-    response = response.json()
-
-    if response["status"] == 1:
-        return response["group"]
-
-    print(response)
-    raise Exception(f"Failed to create group {name}.")
-
-# List of all 32 NHL teams
-
-teams = [
-    "Anaheim Ducks",
-    "Boston Bruins",
-    "Buffalo Sabres",
-    "Calgary Flames",
-    "Carolina Hurricanes",
-    "Chicago Blackhawks",
-    "Colorado Avalanche",
-    "Columbus Blue Jackets",
-    "Dallas Stars",
-    "Detroit Red Wings",
-    "Edmonton Oilers",
-    "Florida Panthers",
-    "Los Angeles Kings",
-    "Minnesota Wild",
-    "Montreal Canadiens",
-    "Nashville Predators",
-    "New Jersey Devils",
-    "New York Islanders",
-    "New York Rangers",
-    "Ottawa Senators",
-    "Philadelphia Flyers",
-    "Pittsburgh Penguins",
-    "San Jose Sharks",
-    "Seattle Kraken",
-    "St. Louis Blues",
-    "Tampa Bay Lightning",
-    "Toronto Maple Leafs",
-    "Utah Hockey Club",
-    "Vancouver Canucks",
-    "Vegas Golden Knights",
-    "Washington Capitals",
-    "Winnipeg Jets"
-]
-
-group_ids = {}
-
-for team in teams:
-    print(f"Creating group {team}...")
-    group_ids[team] = create_group(team)
-
-# write to file
-with open("groups.json", "w") as f:
-    f.write(json.dumps(group_ids, indent=4))
\ No newline at end of file
+    failed = create_missing(args.groups_file, args.workers)
+    if failed:
+        print(f"Could not create {len(failed)} groups, run again to retry: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,105 @@
+"""
+Local stand-in for the Pushover API.
+
+Answers messages.json, groups.json and groups/<key>/add_user.json the way
+Pushover does, including the X-Limit-App-* headers, with optional latency
+and injected failures. Point the app at it with
+PUSHOVER_API_URL=http://localhost:<port>/1 (and any PUSHOVER_APPLICATION_TOKEN).
+
+Usage:
+    python tasks/pushover_stub.py [--port 8099] [--latency 0.2] [--fail-rate 0.1] [--limit 10000]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+state = {"remaining": 10000, "requests": 0}
+state_lock = threading.Lock()
+
+
+class PushoverStub(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    reset = 0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        time.sleep(self.latency)
+
+        with state_lock:
+            state["requests"] += 1
+
+        if "token" not in form:
+            return self.reply(400, {"status": 0, "errors": ["application token is invalid"]})
+        if random.random() < self.fail_rate:
+            return self.reply(500, {"status": 0, "errors": ["injected failure"]})
+
+        if self.path == "/1/messages.json":
+            with state_lock:
+                over_quota = state["remaining"] <= 0
+                if not over_quota:
+                    state["remaining"] -= 1
+            if over_quota:
+                return self.reply(429, {"status": 0, "errors": ["application over quota"]})
+            return self.reply(200, {"status": 1, "request": str(uuid.uuid4())})
+
+        if self.path == "/1/groups.json":
+            return self.reply(200, {"status": 1, "group": "g" + uuid.uuid4().hex[:29], "name": form.get("name")})
+
+        if self.path.startswith("/1/groups/") and self.path.endswith("/add_user.json"):
+            return self.reply(200, {"status": 1, "request": str(uuid.uuid4())})
+
+        self.reply(404, {"status": 0, "errors": ["not found"]})
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        with state_lock:
+            self.send_header("X-Limit-App-Remaining", str(state["remaining"]))
+        self.send_header("X-Limit-App-Reset", str(self.reset))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        print(f"[STUB] {self.command} {self.path} {args[1] if len(args) > 1 else ''}")
+
+
+def serve(port, latency=0.0, fail_rate=0.0, limit=10000, reset_seconds=3600):
+    """Start the stub on a background thread and return the server, call shutdown() to stop it."""
+    PushoverStub.latency = latency
+    PushoverStub.fail_rate = fail_rate
+    PushoverStub.reset = int(time.time() + reset_seconds)
+    state["remaining"] = limit
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), PushoverStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument("--limit", type=int, default=10000, help="messages left before 429s")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.fail_rate, args.limit)
+    print(f"Pushover stub listening on http://127.0.0.1:{args.port}/1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
-from flask import Flask, redirect
+from flask import Flask, make_response, redirect
 from flask import request
-import requests
+from urllib.parse import quote
+from html import escape
+import contextvars
+import hashlib
+import enrollments
 import helpers
-import os
+import pushover
+import rulings
 
 # OpenTelemetry imports
-from opentelemetry.instrumentation.flask import FlaskInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
 import otel_config
 
 # Initialize OpenTelemetry
@@ -14,14 +17,11 @@ otel_config.init_telemetry("situation-room-website", "1.0.0")
 
 app = Flask(__name__)
 
-# Instrument Flask for automatic tracing
-FlaskInstrumentor().instrument_app(app)
+# Instrument Flask for automatic tracing, health checks and metric scrapes are too noisy to trace
+otel_config.instrument_flask(app, excluded_urls="healthz,metrics")
 
 # Instrument requests library for automatic HTTP tracing
-# Exclude OTEL collector endpoints to prevent instrumentation loops
-RequestsInstrumentor().instrument(
-    excluded_urls=".*v1/traces.*,.*opentelemetry-collector.*"
-)
+otel_config.instrument_requests()
 
 def generate_page(title, content, margin="10%"):
     return f"""
@@ -35,13 +35,7 @@ def generate_page(title, content, margin="10%"):
     </body>
     """
 
-@app.route("/")
-def subscribe():
-    success = request.args.get("success")
-    if success is not None:
-        return generate_page("SUCCESS", "<h1>You have successfully subscribed to The Situation Room!</h1><div>Manage your subscriptions in the Pushover app.</div>")
-
-    content = """
+landing_content = """
     <h1>Welcome to The Situation Room</h1>
     <div>Have you ever wondered "why in the hell did they make that call!?" during an NHL game?</div>
     <div>We sync live data, from the NHL situation room straight to your devices using Pushover to let you know their reasoning (not that we'll agree with it).</div>
@@ -72,12 +66,16 @@ def subscribe():
     </div>
     """
 
-    return generate_page("The Situation Room", content)
+def page_etag(page):
+    return hashlib.sha256(page.encode("utf-8")).hexdigest()[:32]
 
-@app.route("/subscribe-choose-team")
-def subscribe_choose_team():
-    user_id = request.args.get("pushover_user_key")
+def cached_page(page, etag):
+    response = make_response(page)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response.make_conditional(request)
 
+def render_choose_team_page(user_id):
     # create a selection of teams to subscribe to
     team_selection = []
     for group in helpers.group_to_team:
@@ -117,6 +115,49 @@ def subscribe_choose_team():
 
     return generate_page("Choose Teams", html, margin="1%")
 
+# Static pages are rendered once at startup
+landing_page = generate_page("The Situation Room", landing_content)
+landing_etag = page_etag(landing_page)
+success_page = generate_page("SUCCESS", "<h1>You have successfully subscribed to The Situation Room!</h1><div>Manage your subscriptions in the Pushover app.</div>")
+success_etag = page_etag(success_page)
+
+# Only the user key changes per request, so the team page is split around it
+user_key_marker = "\x00pushover_user_key\x00"
+choose_team_head, choose_team_tail = render_choose_team_page(user_key_marker).split(user_key_marker)
+
+@app.route("/")
+def subscribe():
+    success = request.args.get("success")
+    if success is not None:
+        return cached_page(success_page, success_etag)
+
+    return cached_page(landing_page, landing_etag)
+
+@app.route("/subscribe-choose-team")
+def subscribe_choose_team():
+    user_id = request.args.get("pushover_user_key", "")
+
+    return choose_team_head + escape(quote(user_id, safe="")) + choose_team_tail
+
+def enroll(row_id):
+    conn = enrollments.connect()
+    try:
+        row = enrollments.get(conn, row_id)
+        try:
+            r = pushover.add_user(row["group_key"], row["user_key"], row["memo"])
+        except pushover.PushoverError as e:
+            print(f"Failed to add {row['user_key']} to {row['team']} (attempt {row['attempts'] + 1}): {e}")
+            enrollments.mark_failed(conn, row_id, str(e))
+            return
+
+        enrollments.mark_done(conn, row_id)
+        print(r.text)
+    finally:
+        conn.close()
+
+def submit_enrollment(row_id):
+    pushover.executor.submit(contextvars.copy_context().run, enroll, row_id)
+
 @app.route("/subscribe-final", methods=["POST"])
 def subscribe_final():
     user_id = request.args.get("pushover_user_key")
@@ -125,17 +166,52 @@ def subscribe_final():
     email = request.form.get("email")
     groups = helpers.get_groups()
 
-    for team in teams:
-        team_group_key = helpers.group_to_team[team]
-        r = requests.post(f"https://api.pushover.net/1/groups/{groups[team_group_key]}/add_user.json", data={
-            "token": os.environ["PUSHOVER_APPLICATION_TOKEN"],
-            "user": user_id,
-            "memo": email
-        })
-        print(r.json())
+    conn = enrollments.connect()
+    try:
+        # Earlier enrollments that failed are retried alongside the new ones
+        row_ids = enrollments.claim_stale(conn)
+        for team in teams:
+            team_group_key = helpers.group_to_team[team]
+            row_ids.append(enrollments.enqueue(conn, user_id, team, groups[team_group_key], email))
+    finally:
+        conn.close()
+
+    # The add_user calls run on the Pushover send pool, the fan is redirected right away
+    for row_id in row_ids:
+        submit_enrollment(row_id)
 
     return redirect('/?success=true')
 
+@app.route("/api/rulings")
+def api_rulings():
+    team = request.args.get("team")
+    post_type = request.args.get("type")
+    try:
+        cursor = int(request.args["cursor"]) if "cursor" in request.args else None
+        limit = int(request.args["limit"]) if "limit" in request.args else None
+    except ValueError:
+        return {"error": "cursor and limit must be integers"}, 400
+
+    body, etag = rulings.query(team.upper() if team else None, post_type, cursor, limit)
+
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={int(rulings.refresh_interval)}"
+    return response.make_conditional(request)
+
+@app.route("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+# Metrics of this worker process, only served when OTEL_PROMETHEUS_ENABLED is set
+@app.route("/metrics")
+def prometheus_metrics():
+    if not otel_config.prometheus_enabled():
+        return "Not Found", 404
+
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+    return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+
 @app.route("/subscribe-fail")
 def subscribe_fail():
     return "There was an error subscribing to The Situation Room. You can email me if this was a mistake: joey@apollorion.com"
\ No newline at end of file